@@ -1,18 +1,22 @@
-from flask import Flask
-from flask_cors import CORS
-from dotenv import load_dotenv
-from .extensions import init_extensions
-from .routes import register_blueprints
-from config import Config
+from app.services.startup_timing import startup_timer
+
+with startup_timer.phase("import", "flask"):
+    from flask import Flask
+    from flask_cors import CORS
+    from dotenv import load_dotenv
+with startup_timer.phase("import", "config"):
+    from .extensions import init_extensions
+    from config import Config
 import os
 
 def create_app():
     print("[DEBUG] create_app() called")
-    load_dotenv()
+    with startup_timer.phase("init", "load_dotenv"):
+        load_dotenv()
     app = Flask(__name__)
 
     app.config.from_object(Config)
-    
+
     # Validate configuration
     if not Config.validate_config():
         raise ValueError("Missing required configuration. Check your .env file.")
@@ -25,6 +29,12 @@ def create_app():
 
     CORS(app)
     init_extensions(app)
-    register_blueprints(app)  # This should handle all blueprint registration
-    
-    return app
\ No newline at end of file
+    # Route modules import the services; LLM clients, Vertex AI and the
+    # LangGraph workflow are only built on first use (see app/services/clients.py)
+    with startup_timer.phase("import", "app.routes"):
+        from .routes import register_blueprints
+    with startup_timer.phase("init", "register_blueprints"):
+        register_blueprints(app)  # This should handle all blueprint registration
+
+    print(startup_timer.format_report())
+    return app
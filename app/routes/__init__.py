@@ -1,6 +1,8 @@
 from .lesson import lesson_bp
 from .combined_assessment_routes import combined_assessment_bp
+from .metrics import metrics_bp
 
 def register_blueprints(app):
     app.register_blueprint(lesson_bp)
-    app.register_blueprint(combined_assessment_bp)
\ No newline at end of file
+    app.register_blueprint(combined_assessment_bp)
+    app.register_blueprint(metrics_bp)
\ No newline at end of file
@@ -2,19 +2,31 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 import os
 
+from app.services.clients import get_or_create
+
 # Import your assessment services (you'll need to create these files)
 try:
     from app.services.combined_assessment import CombinedAssessmentGenerator
-    combined_generator = CombinedAssessmentGenerator()
 except ImportError as e:
     print(f"[WARNING] Could not import CombinedAssessmentGenerator: {e}")
-    combined_generator = None
+    CombinedAssessmentGenerator = None
+
+def get_combined_generator():
+    """Shared generator, built on the first assessment request so its Gemini client isn't created at import"""
+    if CombinedAssessmentGenerator is None:
+        return None
+    try:
+        return get_or_create("combined_assessment_generator", CombinedAssessmentGenerator)
+    except ImportError as e:
+        print(f"[WARNING] Could not create CombinedAssessmentGenerator: {e}")
+        return None
 
 combined_assessment_bp = Blueprint('combined_assessment', __name__)
 
 @combined_assessment_bp.route('/api/assessment/questionnaire/std1-2', methods=['POST'])
 def create_questionnaire_std1_2():
     """Generate complete assessment questionnaire for Std 1-2"""
+    combined_generator = get_combined_generator()
     if not combined_generator:
         return jsonify({
             "success": False,
@@ -68,7 +80,7 @@ def assessment_health():
     """Health check for assessment service"""
     return jsonify({
         "service": "Combined Assessment API",
-        "status": "healthy" if combined_generator else "degraded",
+        "status": "healthy" if CombinedAssessmentGenerator is not None else "degraded",
         "google_api_configured": bool(os.getenv("GOOGLE_API_KEY")),
         "timestamp": datetime.now().isoformat()
     })
\ No newline at end of file
@@ -1,8 +1,18 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from langchain_core.messages import HumanMessage
-from app.workflows.langgraph_workflow import workflow
+from app.workflows.langgraph_workflow import get_workflow
+from app.services.artifact_store import artifact_store
+from app.services.image_cache import image_cache
+from app.services.lesson_cache import cached_invoke, cached_lookup, is_cacheable_result, lesson_cache
+from app.services.hedging import get_hedging_stats
+from app.services.llm_limiter import get_limiter_stats
+from app.services.model_router import get_routing_stats
+from app.services.lesson_stream import format_sse, invoke_with_progress, stream_lesson_events
+from app.services.media_uploader import get_media_uploader
+from app.services.startup_timing import startup_timer
+from app.services.visual_document_generator import get_extraction_stats
+from app.services.visual_jobs import JobQueueFull, visual_job_manager
 import os
-from pathlib import Path
 
 lesson_bp = Blueprint('lesson', __name__)
 
@@ -12,9 +22,14 @@ def home():
         "message": "Professor Agent API is running",
         "endpoints": {
             "generate_lesson": "/api/generate-lesson [POST]",
+            "generate_lesson_stream": "/api/generate-lesson/stream [POST, text/event-stream]",
             "generate_visual_lesson": "/api/generate-visual-lesson [POST]",
+            "submit_visual_lesson_job": "/api/visual-lesson-jobs [POST]",
+            "visual_lesson_job_status": "/api/visual-lesson-jobs/<job_id> [GET]",
+            "media_upload_status": "/api/media-uploads/<blob_name> [GET]",
             "download_visual_lesson": "/api/download-visual-lesson/<filename> [GET]",
-            "health": "/api/health [GET]"
+            "health": "/api/health [GET]",
+            "metrics": "/metrics [GET, Prometheus text format]"
         }
     })
 
@@ -23,152 +38,314 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "service": "Professor Agent API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "lesson_cache": lesson_cache.get_stats(),
+        "image_cache": image_cache.get_stats(),
+        "artifacts": artifact_store.get_stats(),
+        "media_uploads": get_media_uploader().get_stats(),
+        "visual_extraction": get_extraction_stats(),
+        "llm_limits": get_limiter_stats(),
+        "llm_hedging": get_hedging_stats(),
+        "llm_routes": get_routing_stats(),
+        "visual_jobs": visual_job_manager.get_stats(),
+        "startup": startup_timer.get_report()
     })
 
+def _cache_bypass_requested(data) -> bool:
+    """Honour an explicit bypass flag in the body or a no-cache request header"""
+    if data.get('bypass_cache') is True:
+        return True
+    return 'no-cache' in request.headers.get('Cache-Control', '').lower()
+
+def _lesson_request(data):
+    """Build the workflow state and cache key parameters for a standard lesson request"""
+    subject = data.get('subject', '')
+    grades = data.get('grades', '')
+    topic = data.get('topic', '')
+    medium = data.get('medium', '')
+    special_needs = data.get('special_needs', 'Standard differentiation')
+    user_message = data.get('message', 'Generate a lesson plan')
+
+    if not all([subject, grades, topic, medium]):
+        return None, None
+
+    initial_state = {
+        "messages": [HumanMessage(content=user_message)],
+        "lesson_plan": "",
+        "subject": subject,
+        "grades": grades,
+        "topic": topic,
+        "medium": medium,
+        "special_needs": special_needs,
+        "generate_visuals": False  # Standard lesson without visuals
+    }
+
+    cache_params = {
+        "subject": subject,
+        "grades": grades,
+        "topic": topic,
+        "medium": medium,
+        "special_needs": special_needs,
+        "message": user_message
+    }
+    return initial_state, cache_params
+
+def _lesson_response(cache_params, result, cache_status):
+    response_data = {
+        "success": True,
+        "lesson_plan": result["lesson_plan"],
+        "metadata": {
+            "subject": cache_params["subject"],
+            "grades": cache_params["grades"],
+            "topic": cache_params["topic"],
+            "medium": cache_params["medium"],
+            "special_needs": cache_params["special_needs"],
+            "resources": result["resources"],
+            "lesson_plan_with_resource_mapping": result["lesson_plan_with_resource_mapping"],
+            "cache_status": cache_status
+        }
+    }
+    # A near-duplicate hit says which stored request it was served from
+    if result.get("cache_match"):
+        response_data["metadata"]["cache_match"] = result["cache_match"]
+    return response_data
+
 @lesson_bp.route('/api/generate-lesson', methods=['POST'])
 def generate_lesson():
     try:
         data = request.get_json()
-        subject = data.get('subject', '')
-        grades = data.get('grades', '')
-        topic = data.get('topic', '')
-        medium = data.get('medium', '')
-        special_needs = data.get('special_needs', 'Standard differentiation')
-        user_message = data.get('message', 'Generate a lesson plan')
-
-        if not all([subject, grades, topic, medium]):
+        initial_state, cache_params = _lesson_request(data)
+        if initial_state is None:
             return jsonify({"error": "Missing required fields"}), 400
 
-        initial_state = {
-            "messages": [HumanMessage(content=user_message)],
-            "lesson_plan": "",
-            "subject": subject,
-            "grades": grades,
-            "topic": topic,
-            "medium": medium,
-            "special_needs": special_needs,
-            "generate_visuals": False  # Standard lesson without visuals
-        }
+        result, cache_status = cached_invoke(
+            "lesson",
+            cache_params,
+            lambda: get_workflow().invoke(initial_state),
+            bypass=_cache_bypass_requested(data)
+        )
 
-        result = workflow.invoke(initial_state)
-
-        return jsonify({
-            "success": True,
-            "lesson_plan": result["lesson_plan"],
-            "metadata": {
-                "subject": subject,
-                "grades": grades,
-                "topic": topic,
-                "medium": medium,
-                "special_needs": special_needs,
-                "resources": result["resources"],
-                "lesson_plan_with_resource_mapping": result["lesson_plan_with_resource_mapping"]
-            }
-        })
+        return jsonify(_lesson_response(cache_params, result, cache_status))
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@lesson_bp.route('/api/generate-lesson/stream', methods=['POST'])
+def generate_lesson_stream():
+    """Stream lesson generation as Server-Sent Events.
+
+    Lesson-plan tokens are pushed as the model produces them, followed by
+    resource and document events as later graph nodes finish, and a final
+    "done" event carrying the same payload as /api/generate-lesson.
+    """
+    data = request.get_json() or {}
+    initial_state, cache_params = _lesson_request(data)
+    if initial_state is None:
+        return jsonify({"error": "Missing required fields"}), 400
+    bypass = _cache_bypass_requested(data)
+
+    def events():
+        # Flush headers right away so slow connections see the stream open
+        yield ": stream opened\n\n"
+        try:
+            cached, cache_status = (None, None) if bypass else cached_lookup("lesson", cache_params)
+            if cached is not None:
+                yield format_sse("token", {"text": cached.get("lesson_plan", ""), "node": "cache"})
+                yield format_sse("resources", {
+                    "resources": cached.get("resources", []),
+                    "lesson_plan_with_resource_mapping": cached.get("lesson_plan_with_resource_mapping", "")
+                })
+                yield format_sse("done", _lesson_response(cache_params, cached, cache_status))
+                return
+
+            if bypass:
+                lesson_cache.record_bypass()
+            for event, payload in stream_lesson_events(get_workflow(), initial_state):
+                if event == "done":
+                    result = payload["state"]
+                    if is_cacheable_result("lesson", result):
+                        lesson_cache.put("lesson", cache_params, result)
+                    yield format_sse("done", _lesson_response(cache_params, result, "bypass" if bypass else "miss"))
+                else:
+                    yield format_sse(event, payload)
+        except Exception as e:
+            yield format_sse("error", {"success": False, "error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _visual_lesson_request(data):
+    """Build the workflow state and cache key parameters for a visual lesson request"""
+    subject = data.get('subject', '')
+    grades = data.get('grades', '')
+    topic = data.get('topic', '')
+    medium = data.get('medium', '')
+    special_needs = data.get('special_needs', 'Standard differentiation')
+    user_message = data.get('message', 'Generate a lesson plan with visual materials')
+    
+    # Visual generation options
+    include_images = data.get('include_images', True)
+    image_style = data.get('image_style', 'cartoon')  # cartoon, realistic, simple
+    document_format = data.get('document_format', 'docx')  # docx, pdf
+    translation = data.get('translation', '')
+
+    if not all([subject, grades, topic, medium]):
+        return None, None
+
+    initial_state = {
+        "messages": [HumanMessage(content=user_message)],
+        "lesson_plan": "",
+        "subject": subject,
+        "grades": grades,
+        "topic": topic,
+        "medium": medium,
+        "special_needs": special_needs,
+        "generate_visuals": True,  # Enable visual generation
+        "include_images": include_images,
+        "image_style": image_style,
+        "document_format": document_format,
+        "visual_generation_errors": [],
+        "translation": translation
+    }
+
+    cache_params = {
+        "subject": subject,
+        "grades": grades,
+        "topic": topic,
+        "medium": medium,
+        "special_needs": special_needs,
+        "message": user_message,
+        "include_images": include_images,
+        "image_style": image_style,
+        "document_format": document_format,
+        "translation": translation
+    }
+    return initial_state, cache_params
+
+def _visual_lesson_response(cache_params, result, cache_status):
+    response_data = {
+        "success": True,
+        "lesson_plan": result["lesson_plan"],
+        "metadata": {
+            "subject": cache_params["subject"],
+            "grades": cache_params["grades"],
+            "topic": cache_params["topic"],
+            "medium": cache_params["medium"],
+            "special_needs": cache_params["special_needs"],
+            "visual_content_generated": bool(result.get("visual_document_path")),
+            "lesson_plan_with_resource_mapping": result["lesson_plan_with_resource_mapping"],
+            "resources": result["resources"],
+            "translation": cache_params["translation"],
+            "cache_status": cache_status
+        }
+    }
+    if result.get("cache_match"):
+        response_data["metadata"]["cache_match"] = result["cache_match"]
+
+    # Add visual content information if generated
+    if result.get("visual_document_path"):
+        document_filename = os.path.basename(result["visual_document_path"])
+        response_data["visual_document"] = {
+            "filename": document_filename,
+            "download_url": f"/api/download-visual-lesson/{document_filename}",
+            "images_generated": len(result.get("generated_images", {})),
+            "sections_with_visuals": list(result.get("generated_images", {}).keys())
+        }
+
+    # Add any visual generation errors
+    if result.get("visual_generation_errors"):
+        response_data["visual_warnings"] = result["visual_generation_errors"]
+
+    return response_data
+
 @lesson_bp.route('/api/generate-visual-lesson', methods=['POST'])
 def generate_visual_lesson():
     """Generate lesson plan with visual content and downloadable document"""
     try:
         data = request.get_json()
-        subject = data.get('subject', '')
-        grades = data.get('grades', '')
-        topic = data.get('topic', '')
-        medium = data.get('medium', '')
-        special_needs = data.get('special_needs', 'Standard differentiation')
-        user_message = data.get('message', 'Generate a lesson plan with visual materials')
-        
-        # Visual generation options
-        include_images = data.get('include_images', True)
-        image_style = data.get('image_style', 'cartoon')  # cartoon, realistic, simple
-        document_format = data.get('document_format', 'docx')  # docx, pdf
-        translation = data.get('translation', '')
-
-        if not all([subject, grades, topic, medium]):
+        initial_state, cache_params = _visual_lesson_request(data)
+        if initial_state is None:
             return jsonify({"error": "Missing required fields"}), 400
 
-        initial_state = {
-            "messages": [HumanMessage(content=user_message)],
-            "lesson_plan": "",
-            "subject": subject,
-            "grades": grades,
-            "topic": topic,
-            "medium": medium,
-            "special_needs": special_needs,
-            "generate_visuals": True,  # Enable visual generation
-            "image_style": image_style,
-            "document_format": document_format,
-            "visual_generation_errors": [],
-            "translation": translation
-        }
+        result, cache_status = cached_invoke(
+            "visual",
+            cache_params,
+            lambda: get_workflow().invoke(initial_state),
+            bypass=_cache_bypass_requested(data)
+        )
 
-        result = workflow.invoke(initial_state)
+        return jsonify(_visual_lesson_response(cache_params, result, cache_status))
 
-        # Prepare response
-        response_data = {
-            "success": True,
-            "lesson_plan": result["lesson_plan"],
-            "metadata": {
-                "subject": subject,
-                "grades": grades,
-                "topic": topic,
-                "medium": medium,
-                "special_needs": special_needs,
-                "visual_content_generated": bool(result.get("visual_document_path")),
-                "lesson_plan_with_resource_mapping": result["lesson_plan_with_resource_mapping"],
-                "resources": result["resources"],
-                "translation": translation
-            }
-        }
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        # Add visual content information if generated
-        if result.get("visual_document_path"):
-            document_filename = os.path.basename(result["visual_document_path"])
-            response_data["visual_document"] = {
-                "filename": document_filename,
-                "download_url": f"/api/download-visual-lesson/{document_filename}",
-                "images_generated": len(result.get("generated_images", {})),
-                "sections_with_visuals": list(result.get("generated_images", {}).keys())
-            }
+@lesson_bp.route('/api/visual-lesson-jobs', methods=['POST'])
+def submit_visual_lesson_job():
+    """Queue a visual lesson for background generation and return its job id immediately"""
+    try:
+        data = request.get_json() or {}
+        initial_state, cache_params = _visual_lesson_request(data)
+        if initial_state is None:
+            return jsonify({"error": "Missing required fields"}), 400
+        bypass = _cache_bypass_requested(data)
 
-        # Add any visual generation errors
-        if result.get("visual_generation_errors"):
-            response_data["visual_warnings"] = result["visual_generation_errors"]
+        def run(report_node):
+            result, cache_status = cached_invoke(
+                "visual",
+                cache_params,
+                lambda: invoke_with_progress(get_workflow(), initial_state, report_node),
+                bypass=bypass
+            )
+            return _visual_lesson_response(cache_params, result, cache_status)
 
-        return jsonify(response_data)
+        job = visual_job_manager.submit(run)
+        status_url = f"/api/visual-lesson-jobs/{job.job_id}"
+        return jsonify({
+            "success": True,
+            "job_id": job.job_id,
+            "status": job.status,
+            "status_url": status_url
+        }), 202, {"Location": status_url}
 
+    except JobQueueFull as e:
+        return jsonify({"success": False, "error": f"Too many visual lessons in progress: {e}"}), 429, {"Retry-After": "30"}
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@lesson_bp.route('/api/visual-lesson-jobs/<job_id>', methods=['GET'])
+def get_visual_lesson_job(job_id):
+    """Report a visual lesson job's status and per-node progress, with the result once finished"""
+    job = visual_job_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found or expired"}), 404
+    return jsonify({"success": True, **job})
+
+@lesson_bp.route('/api/media-uploads/<path:blob_name>', methods=['GET'])
+def get_media_upload(blob_name):
+    """Report whether a queued media upload has reached the bucket yet"""
+    upload = get_media_uploader().get_status(blob_name)
+    if upload is None:
+        return jsonify({"success": False, "error": "Upload not found"}), 404
+    return jsonify({"success": True, **upload})
+
 @lesson_bp.route('/api/download-visual-lesson/<filename>', methods=['GET'])
 def download_visual_lesson(filename):
-    """Download the generated visual lesson document"""
+    """Download the generated visual lesson document (supports If-None-Match and Range)"""
     try:
-        # Security check - only allow downloading from our generated files
-        safe_filename = os.path.basename(filename)
-        file_path = Path(safe_filename)
-        
-        if not file_path.exists():
+        artifact = artifact_store.get(os.path.basename(filename))
+        if artifact is None:
             return jsonify({"error": "File not found"}), 404
-        
-        # Determine mimetype based on extension
-        if filename.endswith('.docx'):
-            mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        elif filename.endswith('.pdf'):
-            mimetype = 'application/pdf'
-        else:
-            mimetype = 'application/octet-stream'
-        
-        return send_file(
-            file_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype=mimetype
-        )
+
+        response = Response(artifact.data, mimetype=artifact.mimetype)
+        response.headers["Content-Disposition"] = f'attachment; filename="{artifact.filename}"'
+        response.set_etag(artifact.etag)
+        response.last_modified = artifact.created_at
+        response.cache_control.private = True
+        response.cache_control.max_age = int(artifact_store.retention_seconds)
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(artifact.data))
     
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -190,7 +367,7 @@ def generate_lesson_simple():
             "generate_visuals": include_visuals
         }
 
-        result = workflow.invoke(initial_state)
+        result = get_workflow().invoke(initial_state)
 
         response_data = {
             "success": True,
@@ -0,0 +1,79 @@
+import time
+
+from flask import Blueprint, Response, g, request
+
+from app.services.artifact_store import artifact_store
+from app.services.image_cache import image_cache
+from app.services.lesson_cache import lesson_cache
+from app.services.media_uploader import get_media_uploader
+from app.services.metrics import CONTENT_TYPE, http_in_flight, http_request_seconds, http_requests, registry
+from app.services.startup_timing import startup_timer
+from app.services.visual_document_generator import get_extraction_stats
+from app.services.visual_jobs import visual_job_manager
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _stats_samples(prefix: str, help_prefix: str, stats: dict):
+    """Numeric fields of a get_stats() dict as gauge samples"""
+    for field, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        yield f"sahayak_{prefix}_{field}", f"{help_prefix}: {field.replace('_', ' ')}", {}, value
+
+
+def _collect_service_stats():
+    yield from _stats_samples("lesson_cache", "Lesson result cache", lesson_cache.get_stats())
+    yield from _stats_samples("image_cache", "Generated image cache", image_cache.get_stats())
+    yield from _stats_samples("artifact_store", "Rendered document store", artifact_store.get_stats())
+    yield from _stats_samples("visual_extraction", "Visual requirement extraction", get_extraction_stats())
+    yield from _stats_samples("media_uploads", "Background media uploads", get_media_uploader().get_stats())
+    yield from _stats_samples("visual_jobs", "Background visual lesson jobs", visual_job_manager.get_stats())
+
+    startup = startup_timer.get_report()
+    for phase in startup["phases"]:
+        yield ("sahayak_startup_phase_seconds", "Cold-start time by import or client initialization",
+               {"kind": phase["kind"], "name": phase["name"]}, phase["seconds"])
+    if startup["first_request_seconds"] is not None:
+        yield ("sahayak_startup_first_request_seconds", "Time from app import until the first response was sent",
+               {}, startup["first_request_seconds"])
+
+
+registry.register_collector(_collect_service_stats)
+
+
+def _endpoint() -> str:
+    # The route pattern rather than the raw path, so ids don't explode the label set
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+@metrics_bp.before_app_request
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+    g.metrics_endpoint = _endpoint()
+    http_in_flight.inc(endpoint=g.metrics_endpoint)
+
+
+@metrics_bp.after_app_request
+def _record_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@metrics_bp.teardown_app_request
+def _finish_request_timer(exc):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    endpoint = g.pop('metrics_endpoint', 'unmatched')
+    status = 500 if exc is not None else g.pop('metrics_status', 500)
+    http_in_flight.dec(endpoint=endpoint)
+    http_requests.inc(endpoint=endpoint, method=request.method, status=str(status))
+    http_request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+    startup_timer.mark_first_request()
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, workflow, LLM, image and cache metrics"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,221 @@
+# app/services/artifact_store.py
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+mimetypes.add_type(DOCX_MIMETYPE, '.docx')
+
+
+@dataclass
+class Artifact:
+    filename: str
+    data: bytes
+    mimetype: str
+    etag: str
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+
+
+class ArtifactStore:
+    """Directory of rendered documents, one uniquely named artifact per request.
+
+    Every worker process pointed at the same directory serves every artifact,
+    so a download can land on a different worker than the one that rendered
+    it. The worker that rendered a document also keeps its bytes in memory,
+    up to memory_bytes, so a download that lands there isn't read back from
+    disk. Lookups touch only the one file. A file's mtime is when it was
+    created and its atime when it was last downloaded; get() sets the atime
+    itself, so noatime mounts don't matter.
+    Artifacts expire retention_seconds after they were last downloaded or
+    created; the oldest are also dropped once the store exceeds max_bytes.
+    Both are enforced by a directory scan that runs at most once every
+    gc_interval seconds, from put() and get_stats().
+    """
+
+    def __init__(self, directory: str, retention_seconds: float, max_bytes: int,
+                 memory_bytes: int = 32 * 1024 * 1024, gc_interval: float = 60):
+        self.directory = directory
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.gc_interval = gc_interval
+        self._recent: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._recent_bytes = 0
+        self._lock = threading.Lock()
+        self._gc_lock = threading.Lock()
+        self._last_gc = 0.0
+        self._disk = {"artifacts": 0, "bytes": 0}
+        self._stats = {"stored": 0, "downloads": 0, "memory_hits": 0, "expired": 0, "evicted": 0}
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def put(self, data: bytes, prefix: str, extension: str, mimetype: str) -> str:
+        """Store rendered bytes and return the artifact's unique filename"""
+        # The download's type comes from the extension, which any worker can read
+        mimetypes.add_type(mimetype, extension)
+        filename = f"{prefix}_{uuid.uuid4().hex}{extension}"
+        path = self._path(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        artifact = Artifact(filename=filename, data=data, mimetype=mimetype, etag=hashlib.sha256(data).hexdigest())
+        with self._lock:
+            self._stats["stored"] += 1
+            self._remember(artifact)
+        self._maybe_collect_garbage(keep=filename)
+        return filename
+
+    def _remember(self, artifact: Artifact):
+        """Keep artifact's bytes in memory, dropping the least recently used beyond memory_bytes"""
+        if len(artifact.data) > self.memory_bytes:
+            return
+        self._recent[artifact.filename] = artifact
+        self._recent_bytes += len(artifact.data)
+        while self._recent_bytes > self.memory_bytes:
+            _, dropped = self._recent.popitem(last=False)
+            self._recent_bytes -= len(dropped.data)
+
+    def _forget(self, filename: str):
+        dropped = self._recent.pop(filename, None)
+        if dropped is not None:
+            self._recent_bytes -= len(dropped.data)
+
+    def get(self, filename: str) -> Optional[Artifact]:
+        if not self._is_artifact_name(filename):
+            return None
+        path = self._path(filename)
+        with self._lock:
+            artifact = self._recent.get(filename)
+            if artifact is not None:
+                self._recent.move_to_end(filename)
+        now = time.time()
+        try:
+            if artifact is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                created_at = os.stat(path).st_mtime
+                artifact = Artifact(
+                    filename=filename,
+                    data=data,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    etag=hashlib.sha256(data).hexdigest(),
+                    created_at=created_at
+                )
+            else:
+                self._count("memory_hits")
+            # Tells every worker's garbage collection that the file is still in use
+            os.utime(path, (now, artifact.created_at))
+        except FileNotFoundError:
+            # Expired or evicted, possibly by another worker
+            with self._lock:
+                self._forget(filename)
+            return None
+        artifact.last_access = now
+        self._count("downloads")
+        return artifact
+
+    def exists(self, filename: str) -> bool:
+        return self._is_artifact_name(filename) and os.path.exists(self._path(filename))
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    @staticmethod
+    def _is_artifact_name(filename: str) -> bool:
+        return bool(filename) and os.path.basename(filename) == filename and not filename.endswith('.tmp')
+
+    def _list(self) -> List[Tuple[str, int, float]]:
+        """(filename, size, last access) of every stored artifact"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not self._is_artifact_name(name):
+                continue
+            try:
+                stat = os.stat(self._path(name))
+            except FileNotFoundError:
+                continue
+            entries.append((name, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return entries
+
+    def _remove(self, filename: str) -> bool:
+        with self._lock:
+            self._forget(filename)
+        try:
+            os.remove(self._path(filename))
+            return True
+        except FileNotFoundError:
+            # Another worker collected it first
+            return False
+
+    def _maybe_collect_garbage(self, keep: Optional[str] = None):
+        """Scan the directory unless a scan ran in the last gc_interval seconds or is running now"""
+        if time.monotonic() - self._last_gc < self.gc_interval or not self._gc_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_gc = time.monotonic()
+            self._collect_garbage(keep)
+        finally:
+            self._gc_lock.release()
+
+    def _collect_garbage(self, keep: Optional[str] = None):
+        cutoff = time.time() - self.retention_seconds
+        entries = []
+        expired = evicted = 0
+        for filename, size, last_access in self._list():
+            if last_access < cutoff and filename != keep:
+                expired += int(self._remove(filename))
+            else:
+                entries.append((filename, size, last_access))
+
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for filename, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            if filename == keep:
+                continue
+            evicted += int(self._remove(filename))
+            total -= size
+            count -= 1
+
+        with self._lock:
+            self._stats["expired"] += expired
+            self._stats["evicted"] += evicted
+            self._disk = {"artifacts": count, "bytes": total}
+
+    def get_stats(self) -> Dict:
+        self._maybe_collect_garbage()
+        with self._lock:
+            stats = dict(self._stats)
+            # As of the last directory scan
+            stats.update(self._disk)
+            stats["memory_bytes"] = self._recent_bytes
+        stats["max_bytes"] = self.max_bytes
+        stats["retention_seconds"] = self.retention_seconds
+        return stats
+
+
+artifact_store = ArtifactStore(
+    # Shared by every worker on the host; point it at a shared volume when workers span hosts
+    directory=os.getenv('ARTIFACT_DIR', os.path.join(tempfile.gettempdir(), 'sahayak-artifacts')),
+    retention_seconds=float(os.getenv('ARTIFACT_RETENTION_SECONDS', 24 * 3600)),
+    max_bytes=int(os.getenv('ARTIFACT_STORE_MAX_BYTES', 256 * 1024 * 1024)),
+    memory_bytes=int(os.getenv('ARTIFACT_MEMORY_CACHE_BYTES', 32 * 1024 * 1024)),
+    gc_interval=float(os.getenv('ARTIFACT_GC_INTERVAL_SECONDS', 60))
+)
@@ -0,0 +1,91 @@
+# app/services/clients.py
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+from app.services.startup_timing import startup_timer
+
+# One instance per key for the life of the process. gRPC channels, HTTP
+# sessions and TLS connections live inside these clients, so reusing them
+# avoids a fresh handshake on every request.
+_instances: Dict[Hashable, object] = {}
+_key_locks: Dict[Hashable, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def get_or_create(key: Hashable, factory: Callable[[], object], label: Optional[str] = None):
+    """Return the shared instance for key, building it with factory() on first use.
+
+    Construction happens under a per-key lock, so concurrent first requests
+    don't build duplicate clients while factories may themselves fetch other
+    shared clients. A factory that raises is retried on the next call.
+    Construction time goes into the startup report under label, which
+    defaults to the first element of key (keys may hold API keys, so they
+    are never reported whole).
+    """
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        instance = _instances.get(key)
+        if instance is None:
+            started = time.perf_counter()
+            instance = factory()
+            _instances[key] = instance
+            if label is None:
+                label = str(key[0] if isinstance(key, tuple) else key)
+            startup_timer.record("init", label, time.perf_counter() - started)
+    return instance
+
+
+def init_vertex_ai(project_id: Optional[str], location: str):
+    """Call aiplatform.init once per project/location"""
+    def factory():
+        from google.cloud import aiplatform
+        aiplatform.init(project=project_id, location=location)
+        return True
+
+    get_or_create(("vertex_ai_init", project_id, location), factory, label=f"vertex_ai_init:{location}")
+
+
+def get_prediction_client(location: str):
+    """Shared Vertex AI PredictionServiceClient for the regional endpoint"""
+    def factory():
+        from google.cloud import aiplatform
+        return aiplatform.gapic.PredictionServiceClient(
+            client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+        )
+
+    return get_or_create(("prediction_client", location), factory, label=f"prediction_client:{location}")
+
+
+def get_storage_client(project_id: Optional[str]):
+    """Shared Cloud Storage client (keeps its authorized HTTP session between uploads)"""
+    def factory():
+        from google.cloud import storage
+        return storage.Client(project=project_id)
+
+    return get_or_create(("storage_client", project_id), factory)
+
+
+def get_gemini_chat_model(model: str, api_key: Optional[str]):
+    """Shared ChatGoogleGenerativeAI instance per model name and API key.
+
+    The model is wrapped so every call goes through the model's process-wide
+    rate and concurrency limiter (app/services/llm_limiter.py).
+    langchain_google_genai is imported here rather than at module level so
+    that importing the app doesn't pay for it before the first LLM call.
+    """
+    def factory():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from app.services.limited_chat_model import rate_limited
+        from app.services.metrics import llm_metrics_handler
+        return rate_limited(
+            model,
+            ChatGoogleGenerativeAI(model=model, google_api_key=api_key),
+            callbacks=[llm_metrics_handler]
+        )
+
+    return get_or_create(("gemini_chat", model, api_key), factory, label=f"gemini_chat:{model}")
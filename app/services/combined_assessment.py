@@ -1,16 +1,87 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
 import json
-from typing import Dict, List, Optional
+import time
+from typing import Callable, Dict, List, Optional
 from app.services.grade_specific_assessment import GradeSpecificAssessmentGenerator
 
+# Upper bound on concurrent Gemini calls a single questionnaire request may make
+MAX_PARALLEL_SECTIONS = int(os.getenv('ASSESSMENT_MAX_PARALLEL_SECTIONS', 4))
+# How long one section may run before the questionnaire is assembled without it
+SECTION_TIMEOUT_SECONDS = float(os.getenv('ASSESSMENT_SECTION_TIMEOUT_SECONDS', 60))
+# How often to look for newly started sections while some are still queued
+SECTION_POLL_SECONDS = 0.25
+
 class CombinedAssessmentGenerator:
-    def __init__(self):
-        self.model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            google_api_key=os.getenv('GOOGLE_API_KEY')
-        )
+    def __init__(self, max_parallel_sections: int = MAX_PARALLEL_SECTIONS, section_timeout: float = SECTION_TIMEOUT_SECONDS):
         self.grade_generator = GradeSpecificAssessmentGenerator()
+        self.max_parallel_sections = max(1, max_parallel_sections)
+        self.section_timeout = section_timeout
+
+    def _generate_sections(self, tasks: Dict[str, Callable[[], object]]) -> Dict[str, object]:
+        """Run independent section generators concurrently.
+
+        At most max_parallel_sections run at once, and each gets section_timeout
+        seconds from the moment it starts. The whole call is also capped at the
+        time the sections would take in full waves of workers. Sections still
+        queued then, behind workers that hung, are skipped instead of waited
+        for. Sections that fail, time out or never start come back as None so
+        the questionnaire is assembled from whatever finished.
+        """
+        results = {name: None for name in tasks}
+        started: Dict[str, float] = {}
+        workers = min(self.max_parallel_sections, len(tasks))
+        waves = -(-len(tasks) // workers) if tasks else 0
+        overall_deadline = time.monotonic() + waves * self.section_timeout
+
+        def deadline(name):
+            if name not in started:
+                return overall_deadline
+            return min(started[name] + self.section_timeout, overall_deadline)
+
+        def run(name, task):
+            started[name] = time.monotonic()
+            return task()
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, workers),
+            thread_name_prefix="assessment-section"
+        )
+        try:
+            futures = {executor.submit(run, name, task): name for name, task in tasks.items()}
+            pending = set(futures)
+            while pending:
+                now = time.monotonic()
+                wake_at = min(deadline(futures[f]) for f in pending)
+                if any(futures[f] not in started for f in pending):
+                    # A queued section may start at any moment; poll so its deadline is noticed on time
+                    wake_at = min(wake_at, now + min(self.section_timeout, SECTION_POLL_SECONDS))
+                wait_for = max(0.0, wake_at - now)
+                done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        print(f"Error generating section {name}: {e}")
+
+                now = time.monotonic()
+                for future in list(pending):
+                    name = futures[future]
+                    if now < deadline(name):
+                        continue
+                    if name in started:
+                        print(f"⚠️ Section {name} timed out after {self.section_timeout}s, skipping it")
+                    else:
+                        print(f"⚠️ Section {name} never started; all workers are busy with slow sections, skipping it")
+                    future.cancel()
+                    pending.discard(future)
+        finally:
+            # Don't block the response on timed-out calls; let them finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
     
     def create_assessment_questionnaire_std1_2(self, language: str = "Hindi", student_name: str = "", class_section: str = "") -> Optional[Dict]:
         """Creates a complete assessment questionnaire for Std 1-2"""
@@ -28,8 +99,16 @@ class CombinedAssessmentGenerator:
                 "sections": []
             }
             
+            # The four sections are independent, so generate them concurrently
+            generated = self._generate_sections({
+                "word_recognition": lambda: self.grade_generator.generate_simple_words_std1_2(5, language),
+                "sound_recognition": lambda: self.grade_generator.generate_picture_suggestions_for_sounds_std1_2(4, language),
+                "reading_comprehension": lambda: self.grade_generator.generate_simple_story_and_questions_std1_2(1, language, "daily life"),
+                "mathematics": lambda: self.grade_generator.generate_single_digit_word_problems_std1_2(3, language, "addition"),
+            })
+
             # Section 1: Word Recognition
-            simple_words = self.grade_generator.generate_simple_words_std1_2(5, language)
+            simple_words = generated["word_recognition"]
             if simple_words:
                 questionnaire["sections"].append({
                     "section_number": 1,
@@ -44,7 +123,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 2: Initial Sound Recognition
-            picture_sounds = self.grade_generator.generate_picture_suggestions_for_sounds_std1_2(4, language)
+            picture_sounds = generated["sound_recognition"]
             if picture_sounds:
                 questionnaire["sections"].append({
                     "section_number": 2,
@@ -66,7 +145,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 3: Reading Comprehension
-            story_data = self.grade_generator.generate_simple_story_and_questions_std1_2(1, language, "daily life")
+            story_data = generated["reading_comprehension"]
             if story_data:
                 questionnaire["sections"].append({
                     "section_number": 3,
@@ -90,7 +169,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 4: Mathematics
-            math_problems = self.grade_generator.generate_single_digit_word_problems_std1_2(3, language, "addition")
+            math_problems = generated["mathematics"]
             if math_problems:
                 questionnaire["sections"].append({
                     "section_number": 4,
@@ -150,8 +229,17 @@ class CombinedAssessmentGenerator:
                 "sections": []
             }
             
+            # The five sections are independent, so generate them concurrently
+            generated = self._generate_sections({
+                "paragraph_reading": lambda: self.grade_generator.generate_paragraph_for_reading_std3_5(grade_level, language),
+                "inference_comprehension": lambda: self.grade_generator.generate_story_with_inference_questions_std3_5(grade_level, language),
+                "two_digit_math": lambda: self.grade_generator.generate_two_digit_math_problems_std3_5(2, "English", "addition_with_carry"),
+                "multiplication_division": lambda: self.grade_generator.generate_multiplication_division_problems_std3_5(2, "English", "multiplication"),
+                "english_language": lambda: self.grade_generator.generate_simple_english_sentences_std3_5(3),
+            })
+
             # Section 1: Reading Comprehension - Paragraph
-            paragraph = self.grade_generator.generate_paragraph_for_reading_std3_5(grade_level, language)
+            paragraph = generated["paragraph_reading"]
             if paragraph:
                 questionnaire["sections"].append({
                     "section_number": 1,
@@ -172,7 +260,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 2: Story with Inference Questions
-            story_data = self.grade_generator.generate_story_with_inference_questions_std3_5(grade_level, language)
+            story_data = generated["inference_comprehension"]
             if story_data:
                 questionnaire["sections"].append({
                     "section_number": 2,
@@ -198,7 +286,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 3: Two-Digit Mathematics
-            two_digit_problems = self.grade_generator.generate_two_digit_math_problems_std3_5(2, "English", "addition_with_carry")
+            two_digit_problems = generated["two_digit_math"]
             if two_digit_problems:
                 questionnaire["sections"].append({
                     "section_number": 3,
@@ -224,7 +312,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 4: Multiplication/Division
-            mult_div_problems = self.grade_generator.generate_multiplication_division_problems_std3_5(2, "English", "multiplication")
+            mult_div_problems = generated["multiplication_division"]
             if mult_div_problems:
                 questionnaire["sections"].append({
                     "section_number": 4,
@@ -250,7 +338,7 @@ class CombinedAssessmentGenerator:
                 })
             
             # Section 5: English Language
-            english_sentences = self.grade_generator.generate_simple_english_sentences_std3_5(3)
+            english_sentences = generated["english_language"]
             if english_sentences:
                 questionnaire["sections"].append({
                     "section_number": 5,
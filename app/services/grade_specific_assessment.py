@@ -1,15 +1,17 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.services.model_router import route_chat_model
 import os
 import json
 import random
+import re
 from typing import List, Dict, Optional
 
 class GradeSpecificAssessmentGenerator:
     def __init__(self):
-        self.model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            google_api_key=os.getenv('GOOGLE_API_KEY')
-        )
+        self.api_key = os.getenv('GOOGLE_API_KEY')
+
+    def _invoke(self, task: str, prompt: str):
+        """Call the model the router picks for this task class (see app/data/model_routes.json)"""
+        return route_chat_model(task, prompt, self.api_key).invoke(prompt)
     
     # ==================== STD 1-2 FUNCTIONS ====================
     
@@ -22,7 +24,7 @@ class GradeSpecificAssessmentGenerator:
         Example: जल, घर, फल, नल, बस, आम
         """
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             words_str = response.content.strip()
             return [w.strip() for w in words_str.split(',') if w.strip()]
         except Exception as e:
@@ -41,7 +43,7 @@ class GradeSpecificAssessmentGenerator:
         Object: बकरी, Sound: ब
         """
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             suggestions = []
             for line in response.content.strip().split('\n'):
                 if "Object:" in line and "Sound:" in line:
@@ -72,7 +74,7 @@ class GradeSpecificAssessmentGenerator:
         2. [Question 2]
         """
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("assessment_passage", prompt)
             text = response.content.strip()
             parts = text.split("Questions:")
             story = parts[0].replace("Story:", "").strip()
@@ -109,7 +111,7 @@ class GradeSpecificAssessmentGenerator:
 
         prompt = prompts.get(operation_type, prompts["addition"])
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             problems_text = response.content.strip().split('\n\n')
             problems = []
             for problem_block in problems_text:
@@ -136,60 +138,123 @@ class GradeSpecificAssessmentGenerator:
         The paragraph should be coherent and flow naturally.
         """
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("assessment_passage", prompt)
             return response.content.strip()
         except Exception as e:
             print(f"Error generating paragraph: {e}")
             return None
 
     def generate_story_with_inference_questions_std3_5(self, grade_level: int = 3, language: str = "Hindi", complexity: str = "medium") -> Optional[Dict]:
-        """Generates a story with inference questions for Std 3-5."""
+        """Generates a story with inference questions and expected answers for Std 3-5 in a single call."""
         prompt = f"""Generate a short story in {language} suitable for a Standard {grade_level} child.
         The story should be 6-8 sentences long, feature relatable characters or scenarios, and have a clear plot.
         Use vocabulary slightly more advanced than basic, but still within a {grade_level} child's grasp in rural India.
 
-        After the story, provide exactly 3 comprehension questions.
+        After the story, provide exactly 3 comprehension questions, each with a short expected answer in {language}.
         1. A direct recall question.
         2. A question requiring simple inference (e.g., character's feeling, reason for an action).
         3. A question about a moral or a main idea.
 
-        Format:
-        Story:
-        [Your short story text]
-
-        Questions:
-        1. [Direct recall question]
-        2. [Inference question]
-        3. [Moral/Main idea question]
+        Return ONLY a JSON object in this exact format:
+        {{
+            "story": "[Your short story text]",
+            "questions": [
+                {{"question": "[Direct recall question]", "answer": "[Expected answer]"}},
+                {{"question": "[Inference question]", "answer": "[Expected answer]"}},
+                {{"question": "[Moral/Main idea question]", "answer": "[Expected answer]"}}
+            ]
+        }}
         """
         try:
-            response = self.model.invoke(prompt)
-            text = response.content.strip()
-            parts = text.split("Questions:")
-            story = parts[0].replace("Story:", "").strip()
-            questions = [q.strip() for q in parts[1].split('\n') if q.strip()] if len(parts) > 1 else []
-            
-            # Generate expected answers
-            expected_answers = []
-            for i, question in enumerate(questions[:3]):
-                if i == 0:  # Direct recall
-                    answer_prompt = f"Given this story: '{story}' and question '{question}', what is a likely direct answer? Provide only the answer in {language}."
-                elif i == 1:  # Inference
-                    answer_prompt = f"Given this story: '{story}' and question '{question}', what is a likely answer that requires simple inference? Provide only the answer in {language}."
-                else:  # Moral/main idea
-                    answer_prompt = f"Given this story: '{story}' and question '{question}', what is a likely answer for the moral or main idea? Provide only the answer in {language}."
-                
-                try:
-                    temp_response = self.model.invoke(answer_prompt)
-                    expected_answers.append(temp_response.content.strip())
-                except:
-                    expected_answers.append("Answer not generated")
+            response = self._invoke("assessment_passage", prompt)
+            story, questions, expected_answers = self._parse_story_with_answers(response.content)
+            if not story or not questions:
+                raise ValueError("response did not contain a story and questions")
+
+            missing = [i for i, answer in enumerate(expected_answers) if not answer]
+            if missing:
+                filled = self._generate_missing_answers(story, questions, missing, language)
+                for i in missing:
+                    expected_answers[i] = filled.get(i) or "Answer not generated"
 
             return {"story": story, "questions": questions, "expected_answers": expected_answers}
         except Exception as e:
             print(f"Error generating story and questions: {e}")
             return None
 
+    @staticmethod
+    def _parse_json_content(content: str):
+        """Parse JSON from a model reply, tolerating Markdown fences and surrounding text."""
+        text = content.strip()
+        text = re.sub(r'^```[a-zA-Z]*\s*', '', text)
+        text = re.sub(r'\s*```$', '', text)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+            if not starts:
+                raise
+            start = min(starts)
+            end = text.rfind('}' if text[start] == '{' else ']')
+            return json.loads(text[start:end + 1])
+
+    def _parse_story_with_answers(self, content: str):
+        """Validate the structured story reply; falls back to the plain 'Story:/Questions:' layout."""
+        try:
+            data = self._parse_json_content(content)
+        except (json.JSONDecodeError, ValueError):
+            data = None
+
+        if isinstance(data, dict):
+            story = data.get("story")
+            story = story.strip() if isinstance(story, str) else ""
+            questions, answers = [], []
+            for item in data.get("questions") or []:
+                if isinstance(item, dict):
+                    question, answer = item.get("question"), item.get("answer")
+                else:
+                    question, answer = item, None
+                if not isinstance(question, str) or not question.strip():
+                    continue
+                questions.append(question.strip())
+                answers.append(answer.strip() if isinstance(answer, str) else "")
+            return story, questions[:3], answers[:3]
+
+        # The model ignored the JSON instruction; recover story and questions from text
+        text = content.strip()
+        parts = text.split("Questions:")
+        story = parts[0].replace("Story:", "").strip()
+        questions = [q.strip() for q in parts[1].split('\n') if q.strip()][:3] if len(parts) > 1 else []
+        return story, questions, [""] * len(questions)
+
+    def _generate_missing_answers(self, story: str, questions: List[str], missing: List[int], language: str) -> Dict[int, str]:
+        """Fetch the expected answers that the structured call left out, in one batched call."""
+        answer_kinds = ["a likely direct answer", "a likely answer that requires simple inference", "a likely answer for the moral or main idea"]
+        numbered = "\n".join(
+            f"{n + 1}. {questions[i]} ({answer_kinds[i] if i < len(answer_kinds) else 'a likely answer'})"
+            for n, i in enumerate(missing)
+        )
+        prompt = f"""Given this story: '{story}'
+
+        Answer each of these questions. Provide only the answers in {language}.
+        {numbered}
+
+        Return ONLY a JSON array with exactly {len(missing)} answer strings, in the same order as the questions.
+        """
+        try:
+            response = self._invoke("assessment_answers", prompt)
+            answers = self._parse_json_content(response.content)
+            if not isinstance(answers, list):
+                raise ValueError("expected a JSON array of answers")
+            return {
+                i: str(answer).strip()
+                for i, answer in zip(missing, answers)
+                if str(answer).strip()
+            }
+        except Exception as e:
+            print(f"Error generating missing answers: {e}")
+            return {}
+
     def generate_two_digit_math_problems_std3_5(self, num_problems: int = 3, language: str = "English", operation_type: str = "addition_with_carry") -> Optional[List[Dict]]:
         """Generates 2-digit math problems for Std 3-5."""
         prompts = {
@@ -210,7 +275,7 @@ class GradeSpecificAssessmentGenerator:
             return None
 
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             problems_text = response.content.strip().split('\n')
             problems = []
             for line in problems_text:
@@ -246,7 +311,7 @@ class GradeSpecificAssessmentGenerator:
             return None
 
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             problems_text = response.content.strip().split('\n')
             problems = []
             for line in problems_text:
@@ -274,7 +339,7 @@ class GradeSpecificAssessmentGenerator:
         She has a red ball.
         """
         try:
-            response = self.model.invoke(prompt)
+            response = self._invoke("short_structured", prompt)
             return [s.strip() for s in response.content.strip().split('\n') if s.strip()]
         except Exception as e:
             print(f"Error generating English sentences: {e}")
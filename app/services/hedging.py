@@ -0,0 +1,217 @@
+# app/services/hedging.py
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+from app.services.metrics import llm_hedge_calls, llm_hedge_saved_seconds
+
+# Opt-in: a hedge doubles the cost of the calls it fires on
+LLM_HEDGING_ENABLED = os.getenv('LLM_HEDGING_ENABLED', 'False').lower() == 'true'
+# Hedge once the first chunk is later than this percentile of recent first-chunk latencies
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 0.95))
+# Most hedges per call, as a fraction (0.1 = at most one extra request per ten calls)
+LLM_HEDGE_BUDGET = float(os.getenv('LLM_HEDGE_BUDGET', 0.1))
+# No hedging until this many latencies have been observed, nor sooner than the floor
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv('LLM_HEDGE_MIN_DELAY_SECONDS', 1.0))
+# Request timeout for every attempt of a hedged call, so an abandoned one gives back its limiter slot
+LLM_HEDGE_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv('LLM_HEDGE_ATTEMPT_TIMEOUT_SECONDS', 120))
+
+_WINDOW = 200
+_MAX_BUDGET_CREDIT = 5.0
+
+
+class _Attempt:
+    def __init__(self, index: int, started: float):
+        self.index = index
+        self.started = started
+        self.first_chunk_at: Optional[float] = None
+        self.cancelled = threading.Event()
+
+
+class StreamHedger:
+    """Hedged streaming for one LLM call site.
+
+    Streams the reply from one request. If its first chunk is later than
+    the configured percentile of recent first-chunk latencies, an identical
+    request is started, and whichever produces a chunk first supplies the
+    reply. The other request is closed as soon as its thread regains control.
+    A blocked read can't be interrupted, so a stalled request is abandoned
+    rather than killed. Until it ends, it keeps its concurrency slot and token
+    charge in the shared per-model limiter. Every attempt is therefore sent
+    with a request timeout (attempt_timeout, passed to the model as timeout),
+    which bounds how long an abandoned attempt can hold its slot.
+
+    Hedges are paid for from a credit that each call tops up by budget.
+    Hedging therefore never exceeds that fraction of calls, though a short
+    burst of up to _MAX_BUDGET_CREDIT hedges is allowed.
+    """
+
+    def __init__(self, name: str, percentile: float = LLM_HEDGE_PERCENTILE, budget: float = LLM_HEDGE_BUDGET,
+                 min_samples: int = LLM_HEDGE_MIN_SAMPLES, min_delay: float = LLM_HEDGE_MIN_DELAY_SECONDS,
+                 attempt_timeout: float = LLM_HEDGE_ATTEMPT_TIMEOUT_SECONDS):
+        self.name = name
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.attempt_timeout = attempt_timeout
+        self._first_chunk_latencies = deque(maxlen=_WINDOW)
+        self._credit = 1.0
+        self._stats = {"calls": 0, "hedged": 0, "hedge_won": 0, "budget_exhausted": 0}
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for a first chunk before hedging; None until enough history exists"""
+        with self._lock:
+            samples = sorted(self._first_chunk_latencies)
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return max(self.min_delay, samples[index])
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            self._stats["budget_exhausted"] += 1
+            return False
+
+    def _finish_call(self, first_chunk_latency: Optional[float], hedged: bool, hedge_won: bool):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["hedged"] += int(hedged)
+            self._stats["hedge_won"] += int(hedge_won)
+            self._credit = min(_MAX_BUDGET_CREDIT, self._credit + self.budget)
+            if first_chunk_latency is not None:
+                self._first_chunk_latencies.append(first_chunk_latency)
+        if hedged:
+            result = "hedge_won" if hedge_won else "primary_won"
+        else:
+            result = "not_hedged"
+        llm_hedge_calls.inc(call=self.name, result=result)
+
+    def _run(self, attempt: _Attempt, model, prompt: Any, events: "queue.Queue", winner_first_chunk: Dict):
+        # A fresh context: callbacks inherited from the calling graph node would
+        # forward both attempts' tokens, so the caller re-publishes the winner's
+        stream = None
+        try:
+            stream = model.stream(prompt, timeout=self.attempt_timeout)
+            for chunk in stream:
+                if attempt.first_chunk_at is None:
+                    attempt.first_chunk_at = time.monotonic()
+                    if attempt.cancelled.is_set() and winner_first_chunk.get("index", -1) > attempt.index:
+                        # The request a hedge beat finally answered: that's how long we'd have waited
+                        llm_hedge_saved_seconds.observe(attempt.first_chunk_at - winner_first_chunk["at"], call=self.name)
+                if attempt.cancelled.is_set():
+                    return
+                events.put((attempt.index, "chunk", chunk))
+            events.put((attempt.index, "done", None))
+        except Exception as e:
+            events.put((attempt.index, "error", e))
+        finally:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+
+    def _start(self, attempts, model, prompt, events, winner_first_chunk) -> _Attempt:
+        attempt = _Attempt(len(attempts), time.monotonic())
+        attempts.append(attempt)
+        thread = threading.Thread(
+            target=contextvars.Context().run,
+            args=(self._run, attempt, model, prompt, events, winner_first_chunk),
+            name=f"llm-hedge-{self.name}-{attempt.index}",
+            daemon=True,
+        )
+        thread.start()
+        return attempt
+
+    def stream(self, model, prompt: Any) -> Iterator[Any]:
+        """Yield the reply's chunks from whichever request answers first"""
+        events: "queue.Queue" = queue.Queue()
+        attempts = []
+        winner_first_chunk: Dict[str, Any] = {}
+        primary = self._start(attempts, model, prompt, events, winner_first_chunk)
+        delay = self.hedge_delay()
+        hedged = False
+        winner: Optional[_Attempt] = None
+        errors = []
+
+        try:
+            while winner is None:
+                timeout = None
+                if delay is not None and not hedged:
+                    timeout = max(0.0, primary.started + delay - time.monotonic())
+                try:
+                    index, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if self._take_budget():
+                        hedged = True
+                        self._start(attempts, model, prompt, events, winner_first_chunk)
+                    else:
+                        delay = None
+                    continue
+                if kind == "error":
+                    errors.append(payload)
+                    if len(errors) == len(attempts):
+                        raise payload
+                    continue
+                winner = attempts[index]
+                winner_first_chunk.update(index=index, at=winner.first_chunk_at or time.monotonic())
+                for other in attempts:
+                    if other is not winner:
+                        other.cancelled.set()
+                if kind == "chunk":
+                    yield payload
+                else:
+                    return
+
+            while True:
+                index, kind, payload = events.get()
+                if index != winner.index:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    raise payload
+        finally:
+            for attempt in attempts:
+                attempt.cancelled.set()
+            first_chunk = None
+            if winner is not None and winner.first_chunk_at is not None:
+                # Latency of the request that answered, measured from when it was sent
+                first_chunk = winner.first_chunk_at - winner.started
+            self._finish_call(first_chunk, hedged, winner is not None and winner.index > 0)
+
+    def get_stats(self) -> Dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hedge_rate"] = round(stats["hedged"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["hedge_delay_seconds"] = delay
+        return stats
+
+
+_hedgers: Dict[str, StreamHedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def get_hedger(name: str) -> StreamHedger:
+    """The shared hedger for a call site, created on first use"""
+    with _hedgers_lock:
+        hedger = _hedgers.get(name)
+        if hedger is None:
+            hedger = _hedgers[name] = StreamHedger(name)
+        return hedger
+
+
+def get_hedging_stats() -> Dict[str, Dict]:
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {name: hedger.get_stats() for name, hedger in hedgers.items()}
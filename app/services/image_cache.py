@@ -0,0 +1,135 @@
+# app/services/image_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+def make_image_key(prompt: str, model: str, aspect_ratio: str, style: Optional[str] = None) -> str:
+    """Content address for a generated image: everything that changes the pixels"""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "aspect_ratio": aspect_ratio, "style": style or ""},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """Content-addressed on-disk image store with a byte budget and LRU eviction.
+
+    Files live in directory as <key><ext>; a small SQLite index next to them
+    tracks sizes and access times so eviction doesn't need to walk the directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "evicted_bytes": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS images (
+                    key TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_images_last_access ON images(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached image for key, or None on a miss"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT filename FROM images WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path = os.path.join(self.directory, row[0])
+                if os.path.exists(path):
+                    conn.execute("UPDATE images SET last_access = ? WHERE key = ?", (time.time(), key))
+                    conn.commit()
+                    self._stats["hits"] += 1
+                    return path
+                # File was removed behind our back; forget it
+                conn.execute("DELETE FROM images WHERE key = ?", (key,))
+                conn.commit()
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, image_bytes: bytes, extension: str = '.png') -> str:
+        """Store image bytes under key and return the file path"""
+        filename = f"{key}{extension}"
+        path = os.path.join(self.directory, filename)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(image_bytes)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO images (key, filename, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, filename, len(image_bytes), now, now)
+            )
+            self._stats["stores"] += 1
+            self._evict(conn, keep=key)
+            conn.commit()
+        return path
+
+    def _evict(self, conn: sqlite3.Connection, keep: str):
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT key, filename, size FROM images WHERE key != ? ORDER BY last_access ASC", (keep,)
+        ).fetchall()
+        evicted = []
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+            evicted.append(key)
+            total -= size
+            self._stats["evictions"] += 1
+            self._stats["evicted_bytes"] += size
+        conn.executemany("DELETE FROM images WHERE key = ?", [(key,) for key in evicted])
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            try:
+                count, total = self._connection().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images"
+                ).fetchone()
+            except sqlite3.Error:
+                count, total = 0, 0
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["entries"] = count
+        stats["bytes"] = total
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+image_cache = ImageCache(
+    directory=os.getenv('IMAGE_CACHE_DIR', 'generated_images'),
+    max_bytes=int(os.getenv('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+)
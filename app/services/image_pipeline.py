@@ -0,0 +1,90 @@
+# app/services/image_pipeline.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from app.services.lesson_sections import normalize_section_key
+from app.services.metrics import image_generation_seconds, imagen_quota_wait_seconds
+from app.services.rate_limit import TokenBucket
+
+# Images generated at once for a single lesson
+IMAGE_GENERATION_CONCURRENCY = int(os.getenv('IMAGE_GENERATION_CONCURRENCY', 4))
+# Budget for one image, including time spent waiting on the quota limiter
+IMAGE_GENERATION_DEADLINE_SECONDS = float(os.getenv('IMAGE_GENERATION_DEADLINE_SECONDS', 60))
+# Imagen online prediction quota for the project (requests per minute)
+IMAGEN_REQUESTS_PER_MINUTE = float(os.getenv('IMAGEN_REQUESTS_PER_MINUTE', 20))
+IMAGEN_BURST = float(os.getenv('IMAGEN_BURST', 5))
+
+# Process-wide, so concurrent lessons share the project's Imagen quota
+imagen_rate_limiter = TokenBucket(rate_per_second=IMAGEN_REQUESTS_PER_MINUTE / 60.0, capacity=IMAGEN_BURST)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def _generate_one(generator, requirement: Dict, deadline_seconds: float, style: Optional[str]) -> Optional[str]:
+    started = time.monotonic()
+    outcome = "failed"
+    try:
+        acquired = imagen_rate_limiter.acquire(timeout=deadline_seconds)
+        imagen_quota_wait_seconds.observe(time.monotonic() - started)
+        if not acquired:
+            outcome = "quota_timeout"
+            raise TimeoutError("waited too long for Imagen quota")
+        remaining = deadline_seconds - (time.monotonic() - started)
+        if remaining <= 0:
+            outcome = "deadline"
+            raise TimeoutError("deadline passed before generation started")
+        image_path = generator.generate_image(requirement["prompt"], requirement["section"], timeout=remaining, style=style)
+        if image_path:
+            outcome = "ok"
+        return image_path
+    finally:
+        image_generation_seconds.observe(time.monotonic() - started, outcome=outcome)
+
+
+def generate_images(generator, requirements: List[Dict], style: Optional[str] = None,
+                    max_workers: int = IMAGE_GENERATION_CONCURRENCY,
+                    deadline_seconds: float = IMAGE_GENERATION_DEADLINE_SECONDS) -> Tuple[Dict[str, str], List[str]]:
+    """Generate an image per requirement with bounded concurrency.
+
+    Returns (images keyed by section key, error messages). Images that
+    fail or miss their deadline are reported as errors and left out, so the
+    document is assembled from whatever succeeded.
+    """
+    generated_images: Dict[str, str] = {}
+    errors: List[str] = []
+    if not requirements:
+        return generated_images, errors
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requirements))), thread_name_prefix="imagen")
+    try:
+        futures = {
+            executor.submit(_generate_one, generator, req, deadline_seconds, style): (index, req)
+            for index, req in enumerate(requirements)
+        }
+        results = {}
+        for future in as_completed(futures):
+            index, req = futures[future]
+            try:
+                image_path = future.result()
+            except Exception as e:
+                errors.append(f"Image for '{req['section']}' failed: {e}")
+                continue
+            if image_path and image_path.endswith(IMAGE_EXTENSIONS):
+                results[index] = (req, image_path)
+                print(f"Generated image: {image_path}")
+            else:
+                errors.append(f"Image for '{req['section']}' was not generated")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Assemble in requirement order so the first image for a section wins; a merged
+    # requirement's image is used for every section that asked for it
+    for index in sorted(results):
+        req, image_path = results[index]
+        keys = req.get("shared_sections") or [req.get("section_key") or normalize_section_key(req["section"])]
+        for key in keys:
+            generated_images.setdefault(key, image_path)
+
+    return generated_images, errors
@@ -0,0 +1,336 @@
+# app/services/lesson_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.services.artifact_store import artifact_store
+from app.services.semantic_cache import NUMPY_AVAILABLE, SemanticIndex, normalize_words
+
+# Fields of the workflow result that are worth persisting; messages and other
+# LangChain objects are rebuilt per request and never cached.
+CACHED_FIELDS = (
+    "lesson_plan",
+    "resources",
+    "lesson_plan_with_resource_mapping",
+    "generated_images",
+    "visual_document_path",
+)
+
+
+def _normalize_text(value) -> str:
+    return re.sub(r'\s+', ' ', str(value or '')).strip().casefold()
+
+
+def _normalize_grades(grades) -> str:
+    parts = [g.strip() for g in str(grades or '').split(',') if g.strip()]
+    unique = sorted(set(parts), key=lambda g: (0, int(g), g) if g.isdigit() else (1, 0, g.casefold()))
+    return ','.join(unique)
+
+
+def canonicalize_request(params: Dict) -> Dict:
+    """Normalize lesson request parameters so equivalent requests share a cache key"""
+    canonical = {}
+    for field, value in params.items():
+        if field == 'grades':
+            canonical[field] = _normalize_grades(value)
+        elif isinstance(value, bool) or value is None:
+            canonical[field] = value
+        else:
+            canonical[field] = _normalize_text(value)
+    return canonical
+
+
+def make_cache_key(kind: str, params: Dict) -> str:
+    canonical = canonicalize_request(params)
+    payload = json.dumps({"kind": kind, "params": canonical}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _semantic_partition(kind: str, canonical: Dict) -> Tuple:
+    """Everything except the topic must match exactly for a near-duplicate hit.
+
+    That covers grades, medium, special needs, the teacher's message and the
+    visual options. The subject is compared after normalization, so "Maths"
+    and "Mathematics" share a partition. So are the numbers in the topic:
+    "table of 9" and "table of 2" are otherwise alike but different chapters.
+    """
+    options = tuple(sorted((field, value) for field, value in canonical.items() if field not in ('subject', 'topic')))
+    numbers = tuple(sorted({word for word in normalize_words(canonical.get('topic', '')) if word.isdigit()}))
+    return kind, ' '.join(normalize_words(canonical.get('subject', ''))), options, numbers
+
+
+class LessonCache:
+    """SQLite-backed cache of generated lesson plans with TTL and an LRU entry cap.
+
+    With a semantic_threshold, entries are also indexed by topic. Then
+    find_similar() can serve a stored plan for a request that words the same
+    chapter differently. The index lives in memory and is rebuilt from the
+    stored parameters on first use.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_entries: int, enabled: bool = True,
+                 semantic_threshold: Optional[float] = None):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypasses": 0, "stores": 0, "evictions": 0, "expirations": 0, "stale": 0, "errors": 0,
+                       "semantic_hits": 0, "semantic_misses": 0}
+        self.semantic_index = SemanticIndex(semantic_threshold) if semantic_threshold is not None and NUMPY_AVAILABLE else None
+        self._semantic_loaded = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS lesson_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lesson_cache_last_access ON lesson_cache(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def record_bypass(self):
+        self._count("bypasses")
+
+    def record_stale(self):
+        self._count("stale")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        """The stored payload for key, or None if it's missing, expired or unreadable"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT payload, created_at FROM lesson_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                payload, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM lesson_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self._count("expirations")
+                    return None
+                conn.execute("UPDATE lesson_cache SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+            return json.loads(payload)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Lesson cache read failed: {e}")
+            self._count("errors")
+            return None
+
+    def get(self, kind: str, params: Dict) -> Optional[Dict]:
+        """Return the cached result for a request, or None on a miss"""
+        if not self.enabled:
+            return None
+        payload = self._read(make_cache_key(kind, params))
+        self._count("hits" if payload is not None else "misses")
+        return payload
+
+    def _index(self, key: str, kind: str, canonical: Dict):
+        self.semantic_index.add(
+            _semantic_partition(kind, canonical), key, [(canonical.get('topic', ''), 1.0)],
+            {"subject": canonical.get('subject', ''), "topic": canonical.get('topic', '')}
+        )
+
+    def _load_semantic_index(self):
+        """Index the entries already on disk, once per process"""
+        if self._semantic_loaded:
+            return
+        try:
+            with self._lock:
+                if self._semantic_loaded:
+                    return
+                rows = self._connection().execute(
+                    "SELECT key, kind, params FROM lesson_cache WHERE created_at >= ?", (time.time() - self.ttl_seconds,)
+                ).fetchall()
+                self._semantic_loaded = True
+        except sqlite3.Error as e:
+            print(f"⚠️ Lesson cache index load failed: {e}")
+            self._count("errors")
+            return
+        for key, kind, params in rows:
+            try:
+                self._index(key, kind, json.loads(params))
+            except ValueError:
+                continue
+
+    def find_similar(self, kind: str, params: Dict) -> Optional[Tuple[Dict, Dict]]:
+        """(result, match) for the closest stored request on the same chapter, or None.
+
+        match reports the stored request's subject and topic and the cosine
+        similarity of its topic to this one.
+        """
+        if not self.enabled or self.semantic_index is None:
+            return None
+        self._load_semantic_index()
+        canonical = canonicalize_request(params)
+        partition = _semantic_partition(kind, canonical)
+        fields = [(canonical.get('topic', ''), 1.0)]
+        found = self.semantic_index.search(partition, fields)
+        while found is not None:
+            key, similarity, label = found
+            payload = self._read(key)
+            if payload is not None:
+                self._count("semantic_hits")
+                return payload, {**label, "similarity": round(similarity, 4)}
+            # Evicted or expired since it was indexed; the next closest may still be above the threshold
+            self.semantic_index.remove(partition, key)
+            found = self.semantic_index.search(partition, fields)
+        self._count("semantic_misses")
+        return None
+
+    def put(self, kind: str, params: Dict, result: Dict):
+        """Store the cacheable fields of a workflow result"""
+        if not self.enabled:
+            return
+        key = make_cache_key(kind, params)
+        payload = {field: result[field] for field in CACHED_FIELDS if field in result}
+        now = time.time()
+        try:
+            encoded = json.dumps(payload, ensure_ascii=False)
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO lesson_cache (key, kind, params, payload, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, json.dumps(canonicalize_request(params), ensure_ascii=False), encoded, now, now)
+                )
+                self._count("stores")
+                self._evict(conn)
+                conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"⚠️ Lesson cache write failed: {e}")
+            self._count("errors")
+            return
+        if self.semantic_index is not None:
+            if self._semantic_loaded:
+                self._index(key, kind, canonicalize_request(params))
+            else:
+                self._load_semantic_index()
+
+    def _evict(self, conn: sqlite3.Connection):
+        expired = conn.execute(
+            "DELETE FROM lesson_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        if expired:
+            self._count("expirations", expired)
+        (count,) = conn.execute("SELECT COUNT(*) FROM lesson_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM lesson_cache WHERE key IN "
+                "(SELECT key FROM lesson_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._count("evictions", overflow)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM lesson_cache")
+            conn.commit()
+            if self.semantic_index is not None:
+                self.semantic_index = SemanticIndex(self.semantic_index.threshold, self.semantic_index.vectorizer)
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["semantic_enabled"] = self.semantic_index is not None
+        stats["semantic_entries"] = len(self.semantic_index) if self.semantic_index is not None else 0
+        return stats
+
+
+def is_cacheable_result(kind: str, result: Dict) -> bool:
+    """Only keep complete results; visual errors matter only when visuals were requested"""
+    if not result.get("lesson_plan"):
+        return False
+    return kind != "visual" or not result.get("visual_generation_errors")
+
+
+def is_servable_result(kind: str, result: Dict) -> bool:
+    """A cached visual lesson is only usable while its document can still be downloaded"""
+    if kind != "visual" or not result.get("visual_document_path"):
+        return True
+    return artifact_store.exists(result["visual_document_path"])
+
+
+def cached_lookup(kind: str, params: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """Exact match first, then a near-duplicate of the same chapter.
+
+    Returns (result, "hit"), or (result, "semantic_hit") with the matched
+    request under result["cache_match"], or (None, None) on a miss.
+    """
+    cached = lesson_cache.get(kind, params)
+    if cached is not None:
+        if is_servable_result(kind, cached):
+            return cached, "hit"
+        # The entry outlived its document; regenerate and overwrite it
+        lesson_cache.record_stale()
+        return None, None
+
+    similar = lesson_cache.find_similar(kind, params)
+    if similar is not None:
+        result, match = similar
+        if is_servable_result(kind, result):
+            return {**result, "cache_match": match}, "semantic_hit"
+    return None, None
+
+
+def cached_invoke(kind: str, params: Dict, invoke: Callable[[], Dict], bypass: bool = False) -> Tuple[Dict, str]:
+    """Return (result, cache_status) for a request, running invoke() only on a miss.
+
+    A bypassed request always regenerates but still refreshes the stored entry.
+    """
+    if bypass:
+        lesson_cache.record_bypass()
+    else:
+        cached, status = cached_lookup(kind, params)
+        if cached is not None:
+            return cached, status
+
+    result = invoke()
+    if is_cacheable_result(kind, result):
+        lesson_cache.put(kind, params, result)
+    return result, "bypass" if bypass else "miss"
+
+
+lesson_cache = LessonCache(
+    db_path=os.getenv('LESSON_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'sahayak-lesson-cache.sqlite3')),
+    ttl_seconds=float(os.getenv('LESSON_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('LESSON_CACHE_MAX_ENTRIES', 500)),
+    enabled=os.getenv('LESSON_CACHE_ENABLED', 'True').lower() == 'true',
+    semantic_threshold=(
+        float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.85))
+        if os.getenv('SEMANTIC_CACHE_ENABLED', 'True').lower() == 'true' else None
+    )
+)
@@ -1,21 +1,25 @@
 from langchain_core.messages import BaseMessage
 from typing import Annotated, Sequence, TypedDict, Literal
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph.message import add_messages
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from app.services.model_router import route_chat_model
+from app.services.hedging import LLM_HEDGING_ENABLED, get_hedger
+from app.services.lesson_stream import message_text
 from app.services.resource_finder import ResourceFinder
 from typing import TypedDict, Optional, List, Dict
-from jinja2 import Template
-import os
-import json
+from app.services.prompt_templates import render_prompt
+from app.services.metrics import prompt_tokens_estimated
+from app.services.roster_summary import estimate_tokens, load_roster, summarize_roster
 
 load_dotenv()
 
-# Initialize Gemini
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-pro",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+def get_llm(prompt: str = ""):
+    """Gemini model for a lesson plan, chosen by the "lesson_plan" route and built on first use"""
+    return route_chat_model("lesson_plan", prompt)
+
+# Shared across requests; the underlying catalog is parsed lazily and indexed once
+resource_finder = ResourceFinder()
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
@@ -29,6 +33,7 @@ class AgentState(TypedDict):
     lesson_plan: Optional[str]
 
     generate_visuals: Optional[bool]
+    include_images: Optional[bool]
     image_requirements: Optional[List[Dict]]
     generated_images: Optional[Dict[str, str]]
     visual_document_path: Optional[str]
@@ -40,6 +45,34 @@ class AgentState(TypedDict):
     lesson_plan_with_resource_mapping: str
     translation: str
 
+def _stream_lesson_text(prompt: str, call: str) -> str:
+    """Generate the lesson plan token by token.
+
+    Streaming lets LangGraph's "messages" stream mode forward each chunk to
+    clients (see app/services/lesson_stream.py) while the full text is still
+    returned to the graph as before.
+
+    With LLM_HEDGING_ENABLED a call whose first chunk is unusually late gets a
+    duplicate request (see app/services/hedging.py). Those requests run outside
+    the graph's callbacks, so the winner's chunks are re-published here as
+    custom "token" events.
+    """
+    if not LLM_HEDGING_ENABLED:
+        return "".join(message_text(chunk.content) for chunk in get_llm(prompt).stream(prompt))
+
+    try:
+        writer = get_stream_writer()
+        node = get_config()["metadata"].get("langgraph_node")
+    except RuntimeError:
+        writer, node = None, None
+    parts = []
+    for chunk in get_hedger(call).stream(get_llm(prompt), prompt):
+        text = message_text(chunk.content)
+        parts.append(text)
+        if text and writer is not None:
+            writer({"token": text, "node": node})
+    return "".join(parts)
+
 def determine_class_type(state: AgentState):
     """Determine if class is single or multigrade based on grades input"""
     grades = state.get('grades', '')
@@ -62,8 +95,6 @@ def generate_multigrade_lesson(state: AgentState):
     subject = state.get('subject', 'General')
     grade_list = [g.strip() for g in grades.split(",") if g.strip()]
 
-    resource_finder = ResourceFinder()
-
     matching_resources = resource_finder.find_links_by_criteria(
         grades=grades,
         medium=medium,
@@ -86,17 +117,13 @@ def generate_multigrade_lesson(state: AgentState):
         #         os.path.dirname(__file__), 
         #         '..', 'data', 'textbook_links.json'
         #     )
-        json_file_paths = os.path.join(os.path.dirname(__file__), '../', 'data', 'child_assessment_1_2.json')
-        with open(json_file_paths, 'r', encoding='utf-8') as file:
-            learning_levels = json.load(file)
+        roster = load_roster()
+        # The full roster grows the prompt with class size; send a summary that fits the budget
+        learning_levels, detail = summarize_roster(roster, grade_list, subject)
 
-        #prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'multigrade_lesson_prompt.md')
-        prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'generate_lesson_plan_resources_v2.md')
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            raw_prompt = f.read()
-
-        template = Template(raw_prompt)
-        rendered_prompt = template.render(
+        #rendered_prompt = render_prompt('multigrade_lesson_prompt.md', ...)
+        rendered_prompt = render_prompt(
+            'generate_lesson_plan_resources_v2.md',
             grades=grade_list,
             subject=subject,
             topic=topic,
@@ -106,13 +133,19 @@ def generate_multigrade_lesson(state: AgentState):
         )
         prompt = f"<pre>{rendered_prompt}</pre>"
 
+        tokens_after = estimate_tokens(prompt)
+        tokens_before = tokens_after - estimate_tokens(learning_levels) + estimate_tokens(str(roster))
+        prompt_tokens_estimated.observe(tokens_before, prompt="multigrade_lesson", stage="before")
+        prompt_tokens_estimated.observe(tokens_after, prompt="multigrade_lesson", stage="after")
+        print(f"🧮 Multigrade prompt ~{tokens_before} → ~{tokens_after} tokens (roster of {len(roster)} summarized by {detail})")
+
         # print(prompt)
     except Exception as e:
         print("error" + str(e))
     
-    response = llm.invoke(prompt)
+    lesson_plan = _stream_lesson_text(prompt, call="multigrade_lesson")
     return {
-        "lesson_plan": response.content,
+        "lesson_plan": lesson_plan,
         "messages": state['messages']
     }
 
@@ -144,9 +177,9 @@ def generate_single_grade_lesson(state: AgentState):
     Format as a structured, teacher-ready outline with clear grade-specific sections.
     """
     
-    response = llm.invoke(prompt)
+    lesson_plan = _stream_lesson_text(prompt, call="single_grade_lesson")
     return {
-        "lesson_plan": response.content,
+        "lesson_plan": lesson_plan,
         "messages": state['messages']
     }
 
@@ -0,0 +1,148 @@
+# app/services/lesson_sections.py
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+# Rather than testing every line, headings are found by scanning the plan for
+# the few things that can start one; each search has a literal prefix, so the
+# regex engine skips ahead at C speed. Candidate lines are then classified:
+#   # Title / ## Title          markdown ATX heading (level = number of #)
+#   **Title** or **Title**:     a line that is entirely bold (level 2)
+#   Title:                      a line ending in a colon (level 3)
+#   Practice / Hook Activity    a short label naming a lesson phase (level 3)
+_MARKUP_LINE_RE = re.compile(r'\n[ \t]*[#*]')
+_COLON_END_RE = re.compile(r':[ \t]*\r?$', re.MULTILINE)
+_PHASE_KEYWORDS = ('hook', 'objective', 'instruction', 'practice')
+_KEYWORD_RES = tuple(re.compile(keyword) for keyword in _PHASE_KEYWORDS)
+_KEYWORD_RES_ANY_CASE = tuple(re.compile(keyword, re.IGNORECASE) for keyword in _PHASE_KEYWORDS)
+_MAX_LABEL_LENGTH = 80
+
+DEFAULT_SECTION_TITLE = "Overview"
+
+
+def normalize_section_key(title: str) -> str:
+    key = title.strip().lower()
+    key = re.sub(r'[^a-z0-9]+', '_', key)
+    return key.strip('_')
+
+
+@dataclass(frozen=True)
+class Section:
+    """A heading and the span of its body in the original lesson plan.
+
+    Only offsets are stored; body text is sliced out of source on demand.
+    key is unique within a plan: a repeated title gets _2, _3, ... appended.
+    """
+    title: str
+    level: int
+    key: str
+    heading_start: int
+    body_start: int
+    body_end: int
+    source: str = field(repr=False)
+
+    @property
+    def raw_body(self) -> str:
+        return self.source[self.body_start:self.body_end]
+
+    @property
+    def body(self) -> str:
+        """Body lines stripped, with blank lines dropped"""
+        return '\n'.join(line.strip() for line in self.raw_body.splitlines() if line.strip())
+
+    @property
+    def has_body(self) -> bool:
+        return bool(self.raw_body.strip())
+
+
+def _classify_line(line: str) -> Optional[Tuple[str, int]]:
+    """(title, level) if line is a heading, else None"""
+    line = line.strip()
+    if line.startswith('#'):
+        level = min(len(line) - len(line.lstrip('#')), 6)
+    elif line.startswith('**') and line.rstrip(':').endswith('**'):
+        level = 2
+    elif line.endswith(':'):
+        level = 3
+    elif (len(line) <= _MAX_LABEL_LENGTH and not any(mark in line for mark in '.!?')
+          and any(keyword in line.lower() for keyword in _PHASE_KEYWORDS)):
+        level = 3
+    else:
+        return None
+    title = line.strip('*#: \t')
+    return (title, level) if title else None
+
+
+def _candidate_line_starts(lesson_plan: str) -> List[int]:
+    """Sorted start offsets of every line that might be a heading"""
+    starts = {0}
+    starts.update(match.start() + 1 for match in _MARKUP_LINE_RE.finditer(lesson_plan))
+
+    marks = [match.start() for match in _COLON_END_RE.finditer(lesson_plan)]
+    lowered = lesson_plan.lower()
+    if len(lowered) == len(lesson_plan):
+        keyword_res, haystack = _KEYWORD_RES, lowered
+    else:
+        # Lower-casing changed some offsets (e.g. a dotted capital I); search case-insensitively instead
+        keyword_res, haystack = _KEYWORD_RES_ANY_CASE, lesson_plan
+    for keyword_re in keyword_res:
+        marks.extend(match.start() for match in keyword_re.finditer(haystack))
+
+    rfind = lesson_plan.rfind
+    starts.update(rfind('\n', 0, mark) + 1 for mark in marks)
+    return sorted(starts)
+
+
+def tokenize_lesson_plan(lesson_plan: str) -> List[Section]:
+    """Split a lesson plan into its sections, in document order"""
+    sections: List[Section] = []
+    seen_keys = {}
+    # (title, level, heading_start, body_start) of the section still being read
+    pending = (DEFAULT_SECTION_TITLE, 1, 0, 0)
+
+    def close(body_end: int):
+        title, level, heading_start, body_start = pending
+        if body_start == 0 and not lesson_plan[:body_end].strip():
+            return  # nothing before the first heading
+        base_key = normalize_section_key(title) or "section"
+        count = seen_keys.get(base_key, 0) + 1
+        seen_keys[base_key] = count
+        key = base_key if count == 1 else f"{base_key}_{count}"
+        sections.append(Section(title, level, key, heading_start, body_start, body_end, lesson_plan))
+
+    length = len(lesson_plan)
+    for line_start in _candidate_line_starts(lesson_plan):
+        line_end = lesson_plan.find('\n', line_start)
+        if line_end == -1:
+            line_end = length
+        heading = _classify_line(lesson_plan[line_start:line_end])
+        if heading is not None:
+            close(line_start)
+            pending = (heading[0], heading[1], line_start, min(line_end + 1, length))
+
+    close(length)
+    return sections
+
+
+class LessonOutline:
+    """Sections of one lesson plan with lookups by offset and by title"""
+
+    def __init__(self, lesson_plan: str):
+        self.source = lesson_plan
+        self.sections = tokenize_lesson_plan(lesson_plan)
+        self._starts = [section.heading_start for section in self.sections]
+        self._keys_by_title = {}
+        for section in self.sections:
+            self._keys_by_title.setdefault(normalize_section_key(section.title), section.key)
+
+    def section_at(self, offset: int) -> Optional[Section]:
+        """The section whose heading or body contains offset"""
+        if not self.sections:
+            return None
+        index = bisect.bisect_right(self._starts, offset) - 1
+        return self.sections[max(index, 0)]
+
+    def key_for_title(self, title: str) -> Optional[str]:
+        """Key of the first section with this title, if there is one"""
+        return self._keys_by_title.get(normalize_section_key(title))
@@ -0,0 +1,87 @@
+# app/services/lesson_stream.py
+import json
+from typing import Callable, Dict, Iterator, Tuple
+
+# Nodes whose LLM tokens are the lesson plan itself; other nodes (e.g. the
+# resource-mapping call) also use LLMs but their raw tokens aren't shown.
+LESSON_NODES = {"single_professor", "multigrade_professor"}
+
+
+def message_text(content) -> str:
+    """Flatten message content, which may be a string or a list of content parts"""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type", "text") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def stream_lesson_events(workflow, initial_state: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Run the workflow and yield (event, data) pairs as results become available.
+
+    Events, in order:
+      token     - a chunk of lesson-plan text as the model produces it
+      node      - a graph node finished
+      resource  - one resource_list entry, as soon as the model has written it
+      resources - the resource list and resource-mapped lesson plan
+      document  - the visual document, once generate_visuals has run
+      done      - the final workflow state (under "state"; not JSON-ready)
+    """
+    final_state: Dict = dict(initial_state)
+
+    for mode, chunk in workflow.stream(initial_state, stream_mode=["messages", "updates", "custom", "values"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") in LESSON_NODES:
+                text = message_text(message.content)
+                if text:
+                    yield "token", {"text": text, "node": metadata["langgraph_node"]}
+
+        elif mode == "updates":
+            for node, update in chunk.items():
+                yield "node", {"node": node}
+                update = update or {}
+                if node == "generate_resources":
+                    yield "resources", {
+                        "resources": update.get("resources", []),
+                        "lesson_plan_with_resource_mapping": update.get("lesson_plan_with_resource_mapping", ""),
+                    }
+                elif node == "generate_visuals" and update.get("visual_document_path"):
+                    yield "document", {
+                        "visual_document_path": update["visual_document_path"],
+                        "images_generated": len(update.get("generated_images") or {}),
+                    }
+
+        elif mode == "custom":
+            if isinstance(chunk, dict) and "resource" in chunk:
+                yield "resource", {"resource": chunk["resource"]}
+            elif isinstance(chunk, dict) and "token" in chunk:
+                # Lesson text from a hedged call, which bypasses the "messages" mode
+                yield "token", {"text": chunk["token"], "node": chunk.get("node")}
+
+        elif mode == "values":
+            final_state = chunk
+
+    yield "done", {"state": final_state}
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Events frame"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def invoke_with_progress(workflow, initial_state: Dict, on_node: Callable[[str], None]) -> Dict:
+    """Run the workflow to completion, calling on_node(name) as each graph node finishes"""
+    final_state: Dict = dict(initial_state)
+    for mode, chunk in workflow.stream(initial_state, stream_mode=["updates", "values"]):
+        if mode == "updates":
+            for node in chunk:
+                on_node(node)
+        elif mode == "values":
+            final_state = chunk
+    return final_state
@@ -0,0 +1,111 @@
+# app/services/limited_chat_model.py
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.services.llm_limiter import ModelLimiter, get_model_limiter
+
+
+def _record_usage(usage: Dict[str, Optional[int]], message):
+    """Copy the token counts a reply (or its final chunk) reports into usage, keeping earlier ones it omits"""
+    reported = getattr(message, 'usage_metadata', None) or {}
+    usage["tokens"] = reported.get('total_tokens') or usage["tokens"]
+    usage["output_tokens"] = reported.get('output_tokens') or usage["output_tokens"]
+
+
+async def _acquire_off_loop(limiter: ModelLimiter, estimated: float):
+    """Run limiter.acquire in a worker thread; its buckets and slot wait on threading primitives.
+
+    Cancelling the awaiting task can't stop that thread, so the acquire is
+    shielded and, if the caller is cancelled first, whatever it goes on to
+    acquire is released as soon as it returns.
+    """
+    acquiring = asyncio.ensure_future(asyncio.to_thread(limiter.acquire, estimated))
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        def release_if_acquired(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is None:
+                limiter.release(time.monotonic(), estimated, None, asyncio.CancelledError())
+
+        acquiring.add_done_callback(release_if_acquired)
+        raise
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """Chat model that runs every call of the wrapped model through its ModelLimiter.
+
+    It delegates to the inner model's _generate/_stream, passing along the run
+    manager. Callbacks such as the metrics handler therefore belong on this
+    wrapper, and they see the inner model's name through _get_ls_params.
+    """
+
+    inner: BaseChatModel
+    model_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.inner._llm_type}"
+
+    @property
+    def limiter(self) -> ModelLimiter:
+        return get_model_limiter(self.model_name)
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = self.inner._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        with self.limiter.slot(messages) as usage:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            if result.generations:
+                _record_usage(usage, result.generations[0].message)
+            return result
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        with self.limiter.slot(messages) as usage:
+            for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                _record_usage(usage, chunk.message)
+                yield chunk
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        limiter = self.limiter
+        estimated = limiter.estimate_tokens(messages)
+        await _acquire_off_loop(limiter, estimated)
+        started = time.monotonic()
+        usage: Dict[str, Optional[int]] = {"tokens": None, "output_tokens": None}
+        try:
+            result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        except BaseException as e:
+            limiter.release(started, estimated, None, e)
+            raise
+        if result.generations:
+            _record_usage(usage, result.generations[0].message)
+        limiter.release(started, estimated, usage["tokens"], None, usage["output_tokens"])
+        return result
+
+    async def _astream(self, messages, stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        limiter = self.limiter
+        estimated = limiter.estimate_tokens(messages)
+        await _acquire_off_loop(limiter, estimated)
+        started = time.monotonic()
+        usage: Dict[str, Optional[int]] = {"tokens": None, "output_tokens": None}
+        try:
+            async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                _record_usage(usage, chunk.message)
+                yield chunk
+        except BaseException as e:
+            limiter.release(started, estimated, usage["tokens"], e, usage["output_tokens"])
+            raise
+        limiter.release(started, estimated, usage["tokens"], None, usage["output_tokens"])
+
+
+def rate_limited(model_name: str, inner: BaseChatModel, callbacks=None) -> RateLimitedChatModel:
+    """Wrap inner so its calls share model_name's process-wide limiter"""
+    return RateLimitedChatModel(inner=inner, model_name=model_name, callbacks=callbacks)
@@ -0,0 +1,230 @@
+# app/services/llm_limiter.py
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.services.metrics import (
+    llm_concurrency_limit, llm_in_flight, llm_limiter_wait_seconds, llm_throttled
+)
+from app.services.rate_limit import TokenBucket
+
+
+def _model_setting(name: str, model: str, default: float) -> float:
+    """Per-model override (e.g. LLM_REQUESTS_PER_MINUTE_GEMINI_1_5_FLASH), then the shared value"""
+    suffix = re.sub(r'[^A-Za-z0-9]+', '_', model).strip('_').upper()
+    return float(os.getenv(f"{name}_{suffix}", os.getenv(name, default)))
+
+
+class LLMQuotaTimeout(TimeoutError):
+    """Raised when a call waited longer than the queue timeout for quota or a free slot"""
+
+
+class AdaptiveConcurrencyLimiter:
+    """Caps calls in flight with a limit that adapts AIMD-style.
+
+    Each success adds 1/limit to the limit, so it grows by about one per
+    round trip. A 429 halves it. When calls take longer than usual by a
+    smoothed factor above latency_tolerance, the limit shrinks by 10%; that
+    is the sign the backend is queueing our calls rather than serving them.
+    "Usual" is a long-run baseline kept per size class (callers pass the
+    log2 of the reply's output token count). A long lesson plan is compared with
+    other long replies, so a five-word list sharing the model doesn't look
+    like congestion, and neither does the fixed start-up time of short calls.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float,
+                 latency_tolerance: float = 2.0, name: str = ""):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.in_flight = 0
+        self._recent_ratio: Optional[float] = None
+        self._baselines: Dict[int, float] = {}
+        self._condition = threading.Condition()
+        llm_concurrency_limit.set(self.limit, model=name)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+        llm_in_flight.inc(model=self.name)
+        return True
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False, size_class: int = 0):
+        """Free the slot; latency is None for failures that say nothing about load"""
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None:
+                baseline = self._baselines.get(size_class, latency)
+                self._baselines[size_class] = 0.98 * baseline + 0.02 * latency
+                ratio = latency / baseline if baseline > 0 else 1.0
+                self._recent_ratio = ratio if self._recent_ratio is None else 0.8 * self._recent_ratio + 0.2 * ratio
+                if self._recent_ratio > self.latency_tolerance:
+                    self.limit = max(self.minimum, self.limit * 0.9)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            limit = self.limit
+            self._condition.notify_all()
+        llm_in_flight.dec(model=self.name)
+        llm_concurrency_limit.set(limit, model=self.name)
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "recent_latency_ratio": None if self._recent_ratio is None else round(self._recent_ratio, 3),
+            }
+
+
+_THROTTLED_TEXT_RE = re.compile(r"RESOURCE_EXHAUSTED|\b429\b.{0,40}?(too many|quota|rate)", re.IGNORECASE)
+
+
+def _is_throttled(error: BaseException) -> bool:
+    """True for quota errors: HTTP 429 / gRPC RESOURCE_EXHAUSTED, however the client wraps them"""
+    for attribute in ('code', 'status_code'):
+        value = getattr(error, attribute, None)
+        if not callable(value) and value == 429:
+            return True
+    if type(error).__name__ in ('ResourceExhausted', 'TooManyRequests', 'RateLimitError'):
+        return True
+    # A bare "429" could be a token count or an id; only a status line counts
+    return _THROTTLED_TEXT_RE.search(str(error)) is not None
+
+
+def _prompt_chars(messages) -> int:
+    total = 0
+    for message in messages:
+        content = getattr(message, 'content', message)
+        if isinstance(content, list):
+            total += sum(len(part.get('text', '')) if isinstance(part, dict) else len(str(part)) for part in content)
+        else:
+            total += len(str(content))
+    return total
+
+
+class ModelLimiter:
+    """Process-wide quota for one model: requests per minute, tokens per minute,
+    and an adaptive cap on concurrent calls.
+
+    Tokens are charged up front from an estimate (about 4 characters per token
+    of prompt, plus expected_output_tokens). Once the reply reports its usage
+    the bucket is corrected, so the estimate only needs to be roughly right.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        rpm = _model_setting('LLM_REQUESTS_PER_MINUTE', model, 1000)
+        tpm = _model_setting('LLM_TOKENS_PER_MINUTE', model, 4_000_000)
+        self.requests = TokenBucket(rate_per_second=rpm / 60.0, capacity=_model_setting('LLM_BURST', model, 20))
+        self.tokens = TokenBucket(rate_per_second=tpm / 60.0, capacity=tpm)
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=_model_setting('LLM_INITIAL_CONCURRENCY', model, 4),
+            minimum=_model_setting('LLM_MIN_CONCURRENCY', model, 1),
+            maximum=_model_setting('LLM_MAX_CONCURRENCY', model, 16),
+            latency_tolerance=_model_setting('LLM_LATENCY_TOLERANCE', model, 2.0),
+            name=model,
+        )
+        self.expected_output_tokens = _model_setting('LLM_EXPECTED_OUTPUT_TOKENS', model, 1024)
+        self.queue_timeout = _model_setting('LLM_QUEUE_TIMEOUT_SECONDS', model, 120)
+        self._stats = {"calls": 0, "throttled": 0, "queue_timeouts": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, amount in increments.items():
+                self._stats[name] += amount
+
+    def estimate_tokens(self, messages) -> float:
+        estimate = _prompt_chars(messages) / 4 + self.expected_output_tokens
+        # A single call can never need more than the bucket holds
+        return min(estimate, self.tokens.capacity)
+
+    def acquire(self, estimated_tokens: float):
+        """Wait for request quota, token quota and a concurrency slot"""
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        try:
+            if not self.requests.acquire(timeout=self.queue_timeout):
+                raise LLMQuotaTimeout(f"{self.model}: waited too long for request quota")
+            if not self.tokens.acquire(estimated_tokens, timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMQuotaTimeout(f"{self.model}: waited too long for token quota")
+            if not self.concurrency.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                # The call never runs, so its token charge mustn't keep draining the bucket
+                self.tokens.adjust(estimated_tokens)
+                raise LLMQuotaTimeout(f"{self.model}: waited too long for a free call slot")
+        except LLMQuotaTimeout:
+            self._count(queue_timeouts=1)
+            raise
+        finally:
+            llm_limiter_wait_seconds.observe(time.monotonic() - started, model=self.model)
+
+    def release(self, started: float, estimated_tokens: float, used_tokens: Optional[int], error: Optional[BaseException],
+                output_tokens: Optional[int] = None):
+        """used_tokens (prompt plus reply) corrects the quota charge; output_tokens picks the latency size class"""
+        throttled = error is not None and _is_throttled(error)
+        if throttled:
+            llm_throttled.inc(model=self.model)
+        self._count(calls=1, throttled=int(throttled))
+        latency = None if error is not None else time.monotonic() - started
+        # Reply length, not prompt length, is what drives generation time
+        size_class = int(math.log2(max(1.0, output_tokens or self.expected_output_tokens)))
+        self.concurrency.release(latency, throttled, size_class)
+        if used_tokens:
+            self.tokens.adjust(estimated_tokens - used_tokens)
+
+    @contextmanager
+    def slot(self, messages):
+        """Hold quota and a concurrency slot for the duration of one call.
+
+        The body may set usage["tokens"] (prompt plus reply) and
+        usage["output_tokens"] once the reply reports its token counts.
+        """
+        estimated = self.estimate_tokens(messages)
+        self.acquire(estimated)
+        started = time.monotonic()
+        usage: Dict[str, Optional[int]] = {"tokens": None, "output_tokens": None}
+        try:
+            yield usage
+        except BaseException as e:
+            self.release(started, estimated, usage["tokens"], e, usage["output_tokens"])
+            raise
+        self.release(started, estimated, usage["tokens"], None, usage["output_tokens"])
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update(self.concurrency.get_stats())
+        return stats
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_model_limiter(model: str) -> ModelLimiter:
+    """The shared limiter for a model name, created on first use"""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = _limiters[model] = ModelLimiter(model)
+        return limiter
+
+
+def get_limiter_stats() -> Dict[str, Dict]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {model: limiter.get_stats() for model, limiter in limiters.items()}
@@ -0,0 +1,201 @@
+# app/services/media_uploader.py
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.clients import get_or_create, get_storage_client
+from app.services.metrics import media_upload_seconds
+
+
+class GCSBackend:
+    """Google Cloud Storage bucket (uniform bucket-level access; no per-object ACLs)"""
+
+    def __init__(self, bucket_name: str, project_id: Optional[str] = None):
+        self.bucket_name = bucket_name
+        self.project_id = project_id
+
+    @property
+    def bucket(self):
+        return get_storage_client(self.project_id).bucket(self.bucket_name)
+
+    def exists(self, blob_name: str) -> bool:
+        return self.bucket.blob(blob_name).exists()
+
+    def upload(self, blob_name: str, data: bytes, content_type: str):
+        self.bucket.blob(blob_name).upload_from_string(data, content_type=content_type)
+
+    def public_url(self, blob_name: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{blob_name}"
+
+
+class LocalBackend:
+    """Directory standing in for the bucket, for development and tests"""
+
+    def __init__(self, directory: str, base_url: Optional[str] = None):
+        self.directory = directory
+        self.base_url = base_url
+
+    def _path(self, blob_name: str) -> str:
+        return os.path.join(self.directory, *blob_name.split('/'))
+
+    def exists(self, blob_name: str) -> bool:
+        return os.path.exists(self._path(blob_name))
+
+    def upload(self, blob_name: str, data: bytes, content_type: str):
+        path = self._path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def public_url(self, blob_name: str) -> str:
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{blob_name}"
+        return Path(self._path(blob_name)).resolve().as_uri()
+
+
+class MediaUploader:
+    """Write-behind uploader: returns the final URL immediately and uploads on a worker pool.
+
+    Blob names are derived from the content hash, so identical media maps to the
+    same object and repeat uploads are skipped after a cheap existence check.
+    The status of a finished upload is kept for retention_seconds, and at most
+    max_finished of them are kept; the oldest go first.
+    """
+
+    def __init__(self, backend, max_workers: int = 4, prefix: str = 'lesson-images',
+                 retention_seconds: float = 3600, max_finished: int = 10000):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.prefix = prefix
+        self.retention_seconds = retention_seconds
+        self.max_finished = max_finished
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._status: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="media-upload")
+        return self._executor
+
+    def blob_name(self, data: bytes, extension: str = '.png') -> str:
+        return f"{self.prefix}/{hashlib.sha256(data).hexdigest()}{extension}"
+
+    def enqueue(self, data: bytes, content_type: str = 'image/png', extension: str = '.png') -> str:
+        """Queue data for upload and return its public URL straight away"""
+        blob_name = self.blob_name(data, extension)
+        with self._lock:
+            self._purge_finished()
+            current = self._status.get(blob_name)
+            # Already queued, in flight or done in this process; nothing more to do
+            if current is None or current["status"] == "failed":
+                self._status[blob_name] = {"status": "queued", "queued_at": time.time(), "error": None}
+                executor = self._get_executor()
+            else:
+                executor = None
+
+        if executor is not None:
+            executor.submit(self._upload, blob_name, data, content_type)
+        return self.backend.public_url(blob_name)
+
+    def _set_status(self, blob_name: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            entry = self._status.setdefault(blob_name, {"queued_at": time.time()})
+            entry["status"] = status
+            entry["error"] = error
+            if status in ("uploaded", "skipped", "failed"):
+                entry["finished_at"] = time.time()
+                self._purge_finished()
+
+    def _purge_finished(self):
+        """Forget finished uploads past retention, then the oldest beyond max_finished"""
+        cutoff = time.time() - self.retention_seconds
+        finished = sorted(
+            (entry["finished_at"], blob_name) for blob_name, entry in self._status.items() if "finished_at" in entry
+        )
+        excess = len(finished) - self.max_finished
+        for i, (finished_at, blob_name) in enumerate(finished):
+            if finished_at >= cutoff and i >= excess:
+                break
+            del self._status[blob_name]
+
+    def _upload(self, blob_name: str, data: bytes, content_type: str):
+        self._set_status(blob_name, "uploading")
+        started = time.perf_counter()
+        try:
+            if self.backend.exists(blob_name):
+                self._set_status(blob_name, "skipped")
+                media_upload_seconds.observe(time.perf_counter() - started, outcome="skipped")
+                return
+            self.backend.upload(blob_name, data, content_type)
+            self._set_status(blob_name, "uploaded")
+            media_upload_seconds.observe(time.perf_counter() - started, outcome="uploaded")
+            print(f"Uploaded media to: {self.backend.public_url(blob_name)}")
+        except Exception as e:
+            print(f"Error uploading {blob_name}: {e}")
+            self._set_status(blob_name, "failed", str(e))
+            media_upload_seconds.observe(time.perf_counter() - started, outcome="failed")
+
+    def get_status(self, blob_name: str) -> Optional[Dict]:
+        """Status of an upload, or None if it is unknown or finished too long ago"""
+        with self._lock:
+            self._purge_finished()
+            entry = self._status.get(blob_name)
+            if entry is None:
+                return None
+            data = dict(entry)
+        data["blob_name"] = blob_name
+        data["url"] = self.backend.public_url(blob_name)
+        return data
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued or uploading; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                busy = any(e["status"] in ("queued", "uploading") for e in self._status.values())
+            if not busy:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counts = {"queued": 0, "uploading": 0, "uploaded": 0, "skipped": 0, "failed": 0}
+            for entry in self._status.values():
+                counts[entry["status"]] += 1
+        counts["max_workers"] = self.max_workers
+        counts["backend"] = type(self.backend).__name__
+        return counts
+
+
+def get_media_uploader() -> MediaUploader:
+    """Shared uploader for the process, configured from the environment on first use"""
+    def factory():
+        backend_name = os.getenv('MEDIA_STORAGE_BACKEND', 'gcs').lower()
+        if backend_name == 'local':
+            backend = LocalBackend(
+                os.getenv('MEDIA_LOCAL_DIR', 'media_uploads'),
+                os.getenv('MEDIA_PUBLIC_BASE_URL')
+            )
+        else:
+            # Same project, and so the same shared Storage client, as the visual document generator
+            backend = GCSBackend(
+                os.getenv('GCS_BUCKET_NAME', 'attendance-262725'),
+                os.getenv('GCP_PROJECT_ID')
+            )
+        return MediaUploader(
+            backend,
+            max_workers=int(os.getenv('MEDIA_UPLOAD_WORKERS', 4)),
+            retention_seconds=float(os.getenv('MEDIA_UPLOAD_RETENTION_SECONDS', 3600)),
+            max_finished=int(os.getenv('MEDIA_UPLOAD_MAX_TRACKED', 10000))
+        )
+
+    return get_or_create("media_uploader", factory)
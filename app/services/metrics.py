@@ -0,0 +1,349 @@
+# app/services/metrics.py
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Seconds; LLM calls and image generation sit in the 1-60s range
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Characters of prompt or response text
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+# A collector returns gauge samples computed at scrape time: (name, help, labels, value)
+CollectorSample = Tuple[str, str, Dict[str, str], float]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[CollectorSample]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[CollectorSample]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        grouped: Dict[str, Tuple[str, List[Tuple[Dict[str, str], float]]]] = {}
+        for collector in collectors:
+            try:
+                for name, help_text, labels, value in collector():
+                    grouped.setdefault(name, (help_text, []))[1].append((labels, value))
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        for name, (help_text, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+workflow_node_seconds = registry.histogram(
+    'sahayak_workflow_node_duration_seconds', 'Time spent in each LangGraph node', ['node', 'outcome'])
+llm_requests = registry.counter(
+    'sahayak_llm_requests_total', 'LLM calls by model and outcome', ['model', 'outcome'])
+llm_seconds = registry.histogram(
+    'sahayak_llm_request_duration_seconds', 'LLM call latency', ['model'])
+llm_prompt_chars = registry.histogram(
+    'sahayak_llm_prompt_chars', 'Characters of prompt text sent per LLM call', ['model'], SIZE_BUCKETS)
+llm_response_chars = registry.histogram(
+    'sahayak_llm_response_chars', 'Characters of text returned per LLM call', ['model'], SIZE_BUCKETS)
+llm_concurrency_limit = registry.gauge(
+    'sahayak_llm_concurrency_limit', 'Adaptive cap on concurrent calls per model', ['model'])
+llm_in_flight = registry.gauge(
+    'sahayak_llm_in_flight', 'LLM calls currently holding a limiter slot', ['model'])
+llm_limiter_wait_seconds = registry.histogram(
+    'sahayak_llm_limiter_wait_seconds', 'Time spent waiting for LLM request, token and concurrency quota', ['model'])
+llm_throttled = registry.counter(
+    'sahayak_llm_throttled_total', 'LLM calls rejected by the API with a quota (429) error', ['model'])
+llm_route_decisions = registry.counter(
+    'sahayak_llm_route_decisions_total', 'Model chosen by the router per task class', ['route', 'model'])
+llm_route_seconds = registry.histogram(
+    'sahayak_llm_route_duration_seconds', 'LLM call latency per route and the model it was sent to', ['route', 'model'])
+llm_route_tokens = registry.counter(
+    'sahayak_llm_route_tokens_total', 'Tokens reported by the API per route, model and direction', ['route', 'model', 'kind'])
+prompt_tokens_estimated = registry.histogram(
+    'sahayak_prompt_tokens_estimated', 'Estimated prompt tokens before and after compaction', ['prompt', 'stage'], SIZE_BUCKETS)
+llm_hedge_calls = registry.counter(
+    'sahayak_llm_hedge_calls_total', 'Hedged LLM call sites by outcome (not_hedged, primary_won, hedge_won)', ['call', 'result'])
+llm_hedge_saved_seconds = registry.histogram(
+    'sahayak_llm_hedge_latency_saved_seconds', 'First-chunk latency a winning hedge saved over the abandoned request', ['call'])
+image_generation_seconds = registry.histogram(
+    'sahayak_image_generation_duration_seconds', 'Time to produce one lesson image, including quota waits', ['outcome'])
+imagen_quota_wait_seconds = registry.histogram(
+    'sahayak_imagen_quota_wait_seconds', 'Time spent waiting on the shared Imagen rate limiter')
+media_upload_seconds = registry.histogram(
+    'sahayak_media_upload_duration_seconds', 'Background media upload time', ['outcome'])
+http_requests = registry.counter(
+    'sahayak_http_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'method', 'status'])
+http_request_seconds = registry.histogram(
+    'sahayak_http_request_duration_seconds', 'HTTP request latency', ['endpoint'])
+http_in_flight = registry.gauge(
+    'sahayak_http_requests_in_flight', 'Requests currently being handled', ['endpoint'])
+
+
+def timed_node(name: str, node: Callable) -> Callable:
+    """Wrap a LangGraph node so each run is recorded in the node latency histogram"""
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return node(state, *args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            workflow_node_seconds.observe(time.perf_counter() - started, node=name, outcome=outcome)
+
+    return wrapper
+
+
+def _message_chars(messages) -> int:
+    total = 0
+    for batch in messages:
+        for message in batch:
+            content = getattr(message, 'content', message)
+            if isinstance(content, list):
+                total += sum(len(part.get('text', '')) if isinstance(part, dict) else len(str(part)) for part in content)
+            else:
+                total += len(str(content))
+    return total
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback recording per-model call counts, latency and payload sizes"""
+
+    def __init__(self):
+        self._runs: Dict[object, Tuple[float, str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model_name(serialized: Optional[Dict], metadata: Optional[Dict], invocation_params: Optional[Dict]) -> str:
+        for source in (metadata or {}, invocation_params or {}):
+            name = source.get('ls_model_name') or source.get('model') or source.get('model_name')
+            if name:
+                return str(name).replace('models/', '')
+        kwargs = (serialized or {}).get('kwargs', {})
+        return str(kwargs.get('model', 'unknown')).replace('models/', '')
+
+    def _start(self, run_id, model: str, prompt_chars: int, metadata: Optional[Dict]):
+        llm_prompt_chars.observe(prompt_chars, model=model)
+        # Models handed out by app/services/model_router.py carry their route
+        route = (metadata or {}).get('llm_route')
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), model, route)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        model = self._model_name(serialized, metadata, kwargs.get('invocation_params'))
+        self._start(run_id, model, _message_chars(messages), metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        model = self._model_name(serialized, metadata, kwargs.get('invocation_params'))
+        self._start(run_id, model, sum(len(prompt) for prompt in prompts), metadata)
+
+    def _finish(self, run_id, outcome: str) -> Tuple[Optional[str], Optional[str]]:
+        with self._lock:
+            started, model, route = self._runs.pop(run_id, (None, None, None))
+        if started is None:
+            return None, None
+        elapsed = time.perf_counter() - started
+        llm_seconds.observe(elapsed, model=model)
+        llm_requests.inc(model=model, outcome=outcome)
+        if route is not None:
+            llm_route_seconds.observe(elapsed, route=route, model=model)
+        return model, route
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, route = self._finish(run_id, "ok")
+        if model is None:
+            return
+        generations = [generation for batch in response.generations for generation in batch]
+        llm_response_chars.observe(sum(len(generation.text or '') for generation in generations), model=model)
+        if route is not None:
+            for generation in generations:
+                usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                for kind in ('input', 'output'):
+                    if usage.get(f'{kind}_tokens'):
+                        llm_route_tokens.inc(usage[f'{kind}_tokens'], route=route, model=model, kind=kind)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+
+llm_metrics_handler = LLMMetricsHandler()
@@ -0,0 +1,116 @@
+# app/services/model_router.py
+import json
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+from app.services.clients import get_gemini_chat_model, get_or_create
+from app.services.metrics import llm_route_decisions
+
+DEFAULT_ROUTES_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'model_routes.json')
+# Route table: task classes, the tier each one uses and the model behind each tier
+LLM_ROUTES_PATH = os.getenv('LLM_ROUTES_PATH', DEFAULT_ROUTES_PATH)
+# balanced: tiers as declared per task; fast: everything on the fast tier; quality: everything on the quality tier
+LLM_ROUTING_POLICY = os.getenv('LLM_ROUTING_POLICY')
+
+POLICIES = ("balanced", "fast", "quality")
+# Tasks that aren't in the table keep the model every call site used before routing
+_UNKNOWN_TASK_TIER = "quality"
+
+
+def _env_suffix(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').upper()
+
+
+def _prompt_length(prompt) -> int:
+    """Characters of text in a prompt string or a list of messages"""
+    if isinstance(prompt, str):
+        return len(prompt)
+    total = 0
+    for message in prompt or []:
+        content = message.get('content', '') if isinstance(message, dict) else getattr(message, 'content', message)
+        total += len(content) if isinstance(content, str) else len(str(content))
+    return total
+
+
+class ModelRouter:
+    """Picks the Gemini model for each call from its task class.
+
+    Each task in the route table declares a tier, and the table maps each tier
+    to a model. A task can set upgrade_above_chars so that unusually long
+    prompts move up to the quality tier. The policy can move every task to
+    one tier. LLM_ROUTE_<TASK> (a tier or a model name) overrides a single
+    task, e.g. LLM_ROUTE_LESSON_PLAN=fast.
+    """
+
+    def __init__(self, config: Dict, policy: Optional[str] = None):
+        self.models: Dict[str, str] = dict(config["models"])
+        self.tasks: Dict[str, Dict] = dict(config.get("tasks", {}))
+        self.policy = policy or config.get("policy", "balanced")
+        if self.policy not in POLICIES:
+            print(f"⚠️ Unknown LLM routing policy '{self.policy}', using 'balanced'")
+            self.policy = "balanced"
+        for task, route in self.tasks.items():
+            if route.get("tier") not in self.models:
+                raise ValueError(f"Route '{task}' uses tier '{route.get('tier')}', which has no model")
+        self._decisions: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, policy: Optional[str] = None) -> "ModelRouter":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), policy)
+
+    def choose(self, task: str, prompt_chars: int = 0) -> str:
+        """The model name to use for one call of task"""
+        override = os.getenv(f"LLM_ROUTE_{_env_suffix(task)}")
+        if override:
+            model = self.models.get(override, override)
+        else:
+            route = self.tasks.get(task)
+            tier = route["tier"] if route else _UNKNOWN_TASK_TIER
+            upgrade_above = (route or {}).get("upgrade_above_chars")
+            if upgrade_above is not None and prompt_chars > upgrade_above:
+                tier = "quality"
+            if self.policy != "balanced":
+                tier = self.policy
+            model = self.models.get(tier, self.models[_UNKNOWN_TASK_TIER])
+
+        with self._lock:
+            per_model = self._decisions.setdefault(task, {})
+            per_model[model] = per_model.get(model, 0) + 1
+        llm_route_decisions.inc(route=task, model=model)
+        return model
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            decisions = {task: dict(models) for task, models in self._decisions.items()}
+        return {"policy": self.policy, "models": dict(self.models), "decisions": decisions}
+
+
+def get_model_router() -> ModelRouter:
+    """The shared router, reading the route table on first use"""
+    return get_or_create("model_router", lambda: ModelRouter.from_file(LLM_ROUTES_PATH, LLM_ROUTING_POLICY))
+
+
+def route_chat_model(task: str, prompt, api_key: Optional[str] = None):
+    """Chat model for one call of task, chosen from the route table.
+
+    The returned model is the shared, rate-limited model for the chosen name.
+    It is tagged with the route, so LLM metrics carry latency and token usage
+    per route as well as per model.
+    """
+    if api_key is None:
+        api_key = os.getenv("GOOGLE_API_KEY")
+    model = get_model_router().choose(task, _prompt_length(prompt))
+
+    def factory():
+        base = get_gemini_chat_model(model, api_key)
+        return base.model_copy(update={"metadata": {**(base.metadata or {}), "llm_route": task}})
+
+    return get_or_create(("routed_chat", task, model, api_key), factory, label=f"routed_chat:{task}:{model}")
+
+
+def get_routing_stats() -> Dict:
+    return get_model_router().get_stats()
@@ -0,0 +1,89 @@
+# app/services/prompt_templates.py
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), 'prompts')
+
+
+def _default_bytecode_cache_dir() -> str:
+    return os.getenv(
+        'PROMPT_BYTECODE_CACHE_DIR',
+        os.path.join(tempfile.gettempdir(), 'sahayak-jinja-cache')
+    )
+
+
+class PromptRegistry:
+    """Compiles each prompt template once and re-compiles it only when the file changes.
+
+    Templates are loaded through a single jinja2 Environment with auto_reload,
+    so a cache hit costs one stat() of the prompt file. Compiled bytecode is
+    also written to disk, which lets fresh worker processes skip compilation.
+    """
+
+    def __init__(self, prompts_dir: str = PROMPTS_DIR, bytecode_cache_dir: Optional[str] = None):
+        self.prompts_dir = prompts_dir
+        self.env = Environment(
+            loader=FileSystemLoader(prompts_dir, encoding='utf-8'),
+            auto_reload=True,
+            bytecode_cache=self._create_bytecode_cache(bytecode_cache_dir or _default_bytecode_cache_dir())
+        )
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+        self._compiled_ids: Dict[str, int] = {}
+
+    @staticmethod
+    def _create_bytecode_cache(directory: str) -> Optional[FileSystemBytecodeCache]:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return FileSystemBytecodeCache(directory)
+        except OSError as e:
+            print(f"⚠️ Prompt bytecode cache disabled ({directory}): {e}")
+            return None
+
+    def render(self, name: str, **context) -> str:
+        """Render a prompt file from the prompts directory with the given variables"""
+        start = time.perf_counter()
+        template = self.env.get_template(name)
+        loaded = time.perf_counter()
+        rendered = template.render(**context)
+        finished = time.perf_counter()
+
+        self._record(name, id(template), loaded - start, finished - loaded)
+        return rendered
+
+    def _record(self, name: str, template_id: int, load_seconds: float, render_seconds: float):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "renders": 0,
+                "compiles": 0,
+                "load_seconds_total": 0.0,
+                "render_seconds_total": 0.0,
+                "render_seconds_max": 0.0,
+                "last_render_seconds": 0.0,
+            })
+            if self._compiled_ids.get(name) != template_id:
+                self._compiled_ids[name] = template_id
+                stats["compiles"] += 1
+            stats["renders"] += 1
+            stats["load_seconds_total"] += load_seconds
+            stats["render_seconds_total"] += render_seconds
+            stats["render_seconds_max"] = max(stats["render_seconds_max"], render_seconds)
+            stats["last_render_seconds"] = render_seconds
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-template render counts and timings"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+prompt_registry = PromptRegistry()
+
+
+def render_prompt(name: str, **context) -> str:
+    """Render a prompt from app/services/prompts using the shared registry"""
+    return prompt_registry.render(name, **context)
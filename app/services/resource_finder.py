@@ -1,83 +1,191 @@
 import json
 import os
-from typing import List, Dict, Optional
+import re
+import threading
+from typing import List, Dict, Optional, Set, Tuple
 from pathlib import Path
 
-class ResourceFinder:
-    def __init__(self, json_file_path: str = None):
-        """Initialize ResourceFinder with JSON file path"""
-        if json_file_path is None:
-            # Default path relative to the service file
-            json_file_path = os.path.join(
-                os.path.dirname(__file__), 
-                '..', 'data', 'textbook_links.json'
-            )
-        
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'textbook_links.json')
+
+
+def _normalize(value) -> str:
+    """Normalize a catalog field for case- and whitespace-insensitive matching"""
+    return re.sub(r'\s+', ' ', str(value or '')).strip().lower()
+
+
+class ResourceCatalog:
+    """Process-wide, lazily loaded textbook catalog indexed by grade, medium and subject.
+
+    The JSON file is parsed once and re-parsed only when its mtime changes.
+    Lookups resolve the requested medium/subject against the (small) set of
+    distinct values in the catalog, then read matching resources straight
+    from the hash index, so cost scales with the number of matches rather
+    than the size of the catalog.
+    """
+
+    def __init__(self, json_file_path: str):
         self.json_file_path = json_file_path
-        self.resources_data = self._load_json_file()
-    
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._loaded = False
+        self._data: Dict = {"resources": []}
+        # grade -> medium -> subject -> [(position, resource)]
+        self._index: Dict[str, Dict[str, Dict[str, List[Tuple[int, Dict]]]]] = {}
+        self._mediums: Set[str] = set()
+        self._subjects: Set[str] = set()
+        self._resolved: Dict[Tuple[str, str], Set[str]] = {}
+
+    @property
+    def data(self) -> Dict:
+        self._ensure_fresh()
+        return self._data
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.json_file_path).st_mtime
+        except OSError:
+            return None
+
+    def _ensure_fresh(self):
+        mtime = self._current_mtime()
+        if self._loaded and mtime == self._mtime:
+            return
+        with self._lock:
+            if self._loaded and mtime == self._mtime:
+                return
+            self._rebuild(self._load_json_file(), mtime)
+
     def _load_json_file(self) -> Dict:
         """Load and parse the JSON file"""
         try:
             if not os.path.exists(self.json_file_path):
                 print(f"❌ JSON file not found at: {self.json_file_path}")
                 return {"resources": []}
-            
+
             with open(self.json_file_path, 'r', encoding='utf-8') as file:
                 data = json.load(file)
                 print(f"✅ Successfully loaded {len(data.get('resources', []))} resources")
                 return data
-                
+
         except json.JSONDecodeError as e:
             print(f"❌ Error parsing JSON file: {e}")
             return {"resources": []}
         except Exception as e:
             print(f"❌ Error loading JSON file: {e}")
             return {"resources": []}
-    
+
+    def _rebuild(self, data: Dict, mtime: Optional[float]):
+        index: Dict[str, Dict[str, Dict[str, List[Tuple[int, Dict]]]]] = {}
+        mediums: Set[str] = set()
+        subjects: Set[str] = set()
+
+        for position, resource in enumerate(data.get('resources', [])):
+            grade = str(resource.get('grade'))
+            medium = _normalize(resource.get('medium', ''))
+            subject = _normalize(resource.get('subject', ''))
+            mediums.add(medium)
+            subjects.add(subject)
+            index.setdefault(grade, {}).setdefault(medium, {}).setdefault(subject, []).append((position, resource))
+
+        # Swap everything in at once so readers never see a half-built index
+        self._data = data
+        self._index = index
+        self._mediums = mediums
+        self._subjects = subjects
+        self._resolved = {}
+        self._mtime = mtime
+        self._loaded = True
+
+    def _resolve(self, field: str, value: Optional[str]) -> Optional[Set[str]]:
+        """Map a requested medium/subject to the catalog values it matches.
+
+        Keeps the original bidirectional substring semantics ("EVS" matches
+        "evs 1" and "evs-2") but only scans the distinct values, not every resource.
+        Returns None when the field should not filter at all.
+        """
+        if not value:
+            return None
+        query = _normalize(value)
+        cache_key = (field, query)
+        resolved = self._resolved.get(cache_key)
+        if resolved is None:
+            vocabulary = self._mediums if field == 'medium' else self._subjects
+            resolved = {known for known in vocabulary if query in known or known in query}
+            self._resolved[cache_key] = resolved
+        return resolved
+
+    def lookup(self, grade_list: List[str], medium: str = None, subject: str = None) -> List[Dict]:
+        """Return resources for any of the grades that match medium and subject, in file order"""
+        self._ensure_fresh()
+        index = self._index
+        mediums = self._resolve('medium', medium)
+        subjects = self._resolve('subject', subject)
+
+        matches: List[Tuple[int, Dict]] = []
+        for grade in dict.fromkeys(grade_list):
+            by_medium = index.get(grade)
+            if not by_medium:
+                continue
+            medium_keys = by_medium.keys() if mediums is None else mediums
+            for medium_key in medium_keys:
+                by_subject = by_medium.get(medium_key)
+                if not by_subject:
+                    continue
+                subject_keys = by_subject.keys() if subjects is None else subjects
+                for subject_key in subject_keys:
+                    matches.extend(by_subject.get(subject_key, ()))
+
+        matches.sort(key=lambda item: item[0])
+        return [resource for _, resource in matches]
+
+
+_catalogs: Dict[str, ResourceCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_resource_catalog(json_file_path: str = None) -> ResourceCatalog:
+    """Return the shared catalog for a JSON file, creating it on first use"""
+    path = os.path.abspath(json_file_path or DEFAULT_CATALOG_PATH)
+    catalog = _catalogs.get(path)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(path)
+            if catalog is None:
+                catalog = ResourceCatalog(path)
+                _catalogs[path] = catalog
+    return catalog
+
+
+class ResourceFinder:
+    def __init__(self, json_file_path: str = None):
+        """Initialize ResourceFinder backed by the shared catalog for the JSON file"""
+        if json_file_path is None:
+            # Default path relative to the service file
+            json_file_path = DEFAULT_CATALOG_PATH
+
+        self.json_file_path = json_file_path
+        self.catalog = get_resource_catalog(json_file_path)
+
+    @property
+    def resources_data(self) -> Dict:
+        return self.catalog.data
+
     def find_links_by_criteria(self, grades: str, medium: str = None, subject: str = None, topic: str = None) -> List[Dict]:
-        """Find educational links based on grade(s), medium, and topic"""
+        """Find educational links based on grade(s), medium, and subject"""
 
         # Parse grades string into list
         grade_list = self._parse_grades(grades)
-        
-        matching_resources = []
-        
-        for resource in self.resources_data.get('resources', []):
-            medium_match = True
-            if medium:
-                resource_medium = resource.get('medium', '').lower()
-                medium_match = medium.lower() in resource_medium or resource_medium in medium.lower()
-            subject_match = True
-            if subject:
-                resource_subject = resource.get('subject', '').lower()
-                subject_match = subject.lower() in resource_subject or resource_subject in subject.lower()
-            # Check if resource matches any of the specified grades
-            if str(resource.get('grade')) in grade_list and medium_match and subject_match:
-                # Check medium match (case-insensitive)
-                # medium_match = True
-                # if medium:
-                #     resource_medium = resource.get('medium', '').lower()
-                #     medium_match = medium.lower() in resource_medium or resource_medium in medium.lower()
-                
-                # Check topic match (case-insensitive, partial match)
-                # topic_match = True
-                # if topic:
-                #     resource_topic = resource.get('topic', '').lower()
-                #     topic_match = topic.lower() in resource_topic or resource_topic in topic.lower()
-                
-                # If all criteria match, add to results
-                print(medium_match)
-                if medium_match:
-                    matching_resources.append({
-                        'grade': resource.get('grade'),
-                        'medium': resource.get('medium'),
-                        'topic': resource.get('topic'),
-                        'subject': resource.get('subject'),
-                        'link': resource.get('link', [])
-                    })
-        
-        return matching_resources
+
+        return [
+            {
+                'grade': resource.get('grade'),
+                'medium': resource.get('medium'),
+                'topic': resource.get('topic'),
+                'subject': resource.get('subject'),
+                'link': resource.get('link', [])
+            }
+            for resource in self.catalog.lookup(grade_list, medium=medium, subject=subject)
+        ]
     
     def _parse_grades(self, grades_str: str) -> List[str]:
         """Parse grades string into list of individual grades"""
@@ -0,0 +1,109 @@
+# app/services/roster_summary.py
+import json
+import os
+import re
+import statistics
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from app.services.semantic_cache import normalize_words
+
+DEFAULT_ROSTER_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'child_assessment_1_2.json')
+# Most prompt tokens the class roster may take up in the multigrade lesson prompt
+ROSTER_TOKEN_BUDGET = int(os.getenv('ROSTER_TOKEN_BUDGET', 500))
+# Same rough estimate the LLM limiter charges quota with
+CHARS_PER_TOKEN = 4
+
+LEVELS = ("Beginner", "Intermediate", "Advanced")
+MATHS_SCORES = ("Addition", "Subtraction")
+LANGUAGE_SCORES = ("Word Recognition", "Sound Recognition", "Story Comprehension")
+# Richest first; the first one that fits the budget is used
+DETAIL_LEVELS = ("names", "profiles", "counts")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def load_roster(path: str = DEFAULT_ROSTER_PATH) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _score(value) -> float:
+    """Scores are numbers, or strings such as "Answers 2" for story comprehension"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r'\d+(\.\d+)?', str(value or ''))
+    return float(match.group()) if match else 0.0
+
+
+def _is_maths(subject: str) -> bool:
+    return "math" in normalize_words(subject)
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if value == int(value) else f"{value:.1f}"
+
+
+def _grade_line(grade, students: List[Dict], level_field: str, score_fields: Sequence[str], detail: str) -> str:
+    by_level: Dict[str, List[Dict]] = {}
+    for student in students:
+        by_level.setdefault(str(student.get(level_field) or "Unassessed"), []).append(student)
+    ordered = [level for level in LEVELS if level in by_level] + sorted(set(by_level) - set(LEVELS))
+
+    parts = []
+    for level in ordered:
+        group = by_level[level]
+        part = f"{level} {len(group)}"
+        if detail == "names":
+            part += " (" + ", ".join(str(s.get("Student Name", "")).strip() for s in group) + ")"
+        if detail in ("names", "profiles"):
+            # A representative profile: the group's median on each relevant score
+            medians = ", ".join(
+                f"{field} {_format_number(statistics.median(_score(s.get(field)) for s in group))}" for field in score_fields
+            )
+            part += f", median {medians}"
+        parts.append(part)
+
+    line = f"Grade {grade} ({len(students)} students): " + "; ".join(parts)
+    if detail in ("names", "profiles"):
+        languages = Counter(str(s.get("Language Spoken", "")).strip().title() for s in students if s.get("Language Spoken"))
+        if languages:
+            line += ". Languages spoken: " + ", ".join(f"{name} {count}" for name, count in languages.most_common())
+    return line
+
+
+def summarize_roster(roster: List[Dict], grades: Sequence[str], subject: str,
+                     token_budget: int = ROSTER_TOKEN_BUDGET) -> Tuple[str, str]:
+    """Summarize the assessment roster for the lesson prompt within token_budget.
+
+    Students are grouped per grade by their Maths or Language Learning Level,
+    whichever the lesson's subject uses, with a count per level. Detail is
+    dropped until the text fits the budget: first the names in each group,
+    then the median scores and spoken languages. If even the counts don't
+    fit, the counts are returned anyway. Only the lesson's grades are
+    included, unless none of the roster's students are in them.
+
+    Returns (summary, detail level used).
+    """
+    wanted = {str(grade).strip() for grade in grades}
+    students = [s for s in roster if str(s.get("Grade", "")).strip() in wanted] or list(roster)
+
+    maths = _is_maths(subject)
+    level_field = "Maths Learning Level" if maths else "Language Learning Level"
+    score_fields = MATHS_SCORES if maths else LANGUAGE_SCORES
+
+    by_grade: Dict[str, List[Dict]] = {}
+    for student in students:
+        by_grade.setdefault(str(student.get("Grade", "?")), []).append(student)
+    grade_order = sorted(by_grade, key=lambda g: (0, int(g)) if g.isdigit() else (1, 0))
+
+    header = f"{len(students)} students, grouped by {level_field}."
+    summary = header
+    for detail in DETAIL_LEVELS:
+        lines = [_grade_line(grade, by_grade[grade], level_field, score_fields, detail) for grade in grade_order]
+        summary = "\n".join([header] + lines)
+        if estimate_tokens(summary) <= token_budget:
+            return summary, detail
+    return summary, DETAIL_LEVELS[-1]
@@ -0,0 +1,180 @@
+# app/services/semantic_cache.py
+import importlib.util
+import re
+import threading
+import zlib
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.services.text_similarity import split_words
+
+# numpy is imported on first use so the app's cold start doesn't pay for it
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# Spellings teachers use for the same subject or topic, mapped to one form
+_CANONICAL_WORDS = {
+    "maths": "math", "mathematics": "math", "ganit": "math", "गणित": "math",
+    "evs": "environment", "environmental": "environment", "पर्यावरण": "environment",
+    "sci": "science", "विज्ञान": "science", "eng": "english", "अंग्रेज़ी": "english", "अंग्रेजी": "english",
+    "hin": "hindi", "हिंदी": "hindi", "हिन्दी": "hindi",
+}
+# Words that say nothing about the chapter
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "and", "for", "in", "on", "to", "about", "with", "introduction", "intro",
+    "grade", "grades", "class", "std", "standard", "lesson", "lessons", "plan", "chapter", "topic",
+    "studies", "subject", "कक्षा",
+}
+# A number right after one of these is a grade, which entries are already partitioned by;
+# any other number ("table of 9", "3-digit numbers") is part of the chapter
+_GRADE_WORDS = {"grade", "grades", "class", "std", "standard", "कक्षा"}
+# "non-living" and "non living" become "nonliving", so they don't look like "living"
+_NEGATION_RE = re.compile(r"\b(non|un)[\s-]+(?=\w)")
+
+
+def normalize_words(text: str) -> List[str]:
+    words = []
+    previous = None
+    text = _NEGATION_RE.sub(r"\1", str(text or '').casefold())
+    for word in split_words(text):
+        after_grade_word, previous = previous in _GRADE_WORDS, word
+        if word.isdigit():
+            if after_grade_word:
+                continue
+            words.append(str(int(word)))
+            continue
+        if word in _FILLER_WORDS:
+            continue
+        word = _CANONICAL_WORDS.get(word, word)
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+class HashedNgramVectorizer:
+    """Embeds short texts as L2-normalized vectors of hashed n-gram counts.
+
+    The features are whole words, pairs of adjacent words, and character
+    n-grams of each word padded with boundary markers. Character n-grams
+    keep small spelling differences, such as "colour" and "color", close
+    rather than unrelated.
+    Features are hashed with CRC32, which unlike hash() is stable across
+    processes.
+    """
+
+    def __init__(self, dimensions: int = 2048, char_sizes: Tuple[int, ...] = (3, 4)):
+        self.dimensions = dimensions
+        self.char_sizes = char_sizes
+
+    def features(self, text: str, weight: float = 1.0, into: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        words = normalize_words(text)
+        features: Dict[str, float] = {} if into is None else into
+
+        def add(feature: str, amount: float):
+            features[feature] = features.get(feature, 0.0) + amount * weight
+
+        for word in words:
+            add(f"w:{word}", 1.0)
+            padded = f"<{word}>"
+            for size in self.char_sizes:
+                for i in range(max(1, len(padded) - size + 1)):
+                    add(f"c:{padded[i:i + size]}", 0.5)
+        for first, second in zip(words, words[1:]):
+            add(f"b:{first} {second}", 0.5)
+        return features
+
+    def transform(self, fields: Sequence[Tuple[str, float]]):
+        """Unit vector for (text, weight) fields, e.g. [(subject, 0.5), (topic, 1.0)]"""
+        import numpy as np
+
+        features: Dict[str, float] = {}
+        for text, weight in fields:
+            self.features(text, weight, into=features)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in features.items():
+            vector[zlib.crc32(feature.encode('utf-8')) % self.dimensions] += weight
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class _Partition:
+    def __init__(self, dimensions: int):
+        import numpy as np
+
+        self.vectors = np.zeros((8, dimensions), dtype=np.float32)
+        self.keys: List[str] = []
+        self.labels: List[Dict] = []
+
+    def add(self, key: str, vector, label: Dict):
+        import numpy as np
+
+        if key in self.keys:
+            index = self.keys.index(key)
+            self.vectors[index] = vector
+            self.labels[index] = label
+            return
+        if len(self.keys) == len(self.vectors):
+            grown = np.zeros((2 * len(self.vectors), self.vectors.shape[1]), dtype=np.float32)
+            grown[:len(self.keys)] = self.vectors
+            self.vectors = grown
+        self.vectors[len(self.keys)] = vector
+        self.keys.append(key)
+        self.labels.append(label)
+
+    def remove(self, key: str):
+        if key not in self.keys:
+            return
+        index = self.keys.index(key)
+        last = len(self.keys) - 1
+        # Move the last row into the gap so rows stay contiguous
+        self.vectors[index] = self.vectors[last]
+        self.keys[index], self.labels[index] = self.keys[last], self.labels[last]
+        self.keys.pop()
+        self.labels.pop()
+
+
+class SemanticIndex:
+    """In-memory cosine-similarity index over embedded texts, split into partitions.
+
+    A search only compares against entries in the same partition (for lessons,
+    the same grades, medium and request options), so a near-duplicate
+    phrasing can never cross into another grade or language. Vectors are unit
+    length, so cosine similarity is one matrix-vector product per search.
+    """
+
+    def __init__(self, threshold: float, vectorizer: Optional[HashedNgramVectorizer] = None):
+        self.threshold = threshold
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self._partitions: Dict[Hashable, _Partition] = {}
+        self._lock = threading.Lock()
+
+    def add(self, partition: Hashable, key: str, fields: Sequence[Tuple[str, float]], label: Dict):
+        vector = self.vectorizer.transform(fields)
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None:
+                entries = self._partitions[partition] = _Partition(self.vectorizer.dimensions)
+            entries.add(key, vector, label)
+
+    def remove(self, partition: Hashable, key: str):
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is not None:
+                entries.remove(key)
+
+    def search(self, partition: Hashable, fields: Sequence[Tuple[str, float]]) -> Optional[Tuple[str, float, Dict]]:
+        """(key, similarity, label) of the closest entry at or above the threshold, else None"""
+        vector = self.vectorizer.transform(fields)
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None or not entries.keys:
+                return None
+            similarities = entries.vectors[:len(entries.keys)] @ vector
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None
+            return entries.keys[best], similarity, entries.labels[best]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries.keys) for entries in self._partitions.values())
@@ -0,0 +1,70 @@
+# app/services/startup_timing.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class StartupTimer:
+    """Records where cold-start time goes: module imports, client construction
+    and the wait until the first request has been served.
+
+    Times are relative to the moment this module was first imported, which
+    app/__init__.py does before anything else.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._phases: List[Dict] = []
+        self._first_request: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float):
+        with self._lock:
+            self._phases.append({
+                "kind": kind,
+                "name": name,
+                "seconds": round(seconds, 4),
+                "at": round(time.perf_counter() - self.started, 4),
+            })
+
+    @contextmanager
+    def phase(self, kind: str, name: str):
+        """Time the block as one entry of the report ("import" or "init")"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - started)
+
+    def mark_first_request(self):
+        if self._first_request is not None:
+            return
+        with self._lock:
+            if self._first_request is None:
+                self._first_request = time.perf_counter() - self.started
+
+    def get_report(self) -> Dict:
+        with self._lock:
+            phases = list(self._phases)
+            first_request = self._first_request
+        totals: Dict[str, float] = {}
+        for phase in phases:
+            totals[phase["kind"]] = round(totals.get(phase["kind"], 0.0) + phase["seconds"], 4)
+        return {
+            "phases": phases,
+            "totals": totals,
+            "first_request_seconds": None if first_request is None else round(first_request, 4),
+        }
+
+    def format_report(self) -> str:
+        report = self.get_report()
+        lines = ["[STARTUP] phase timings (seconds):"]
+        for phase in report["phases"]:
+            lines.append(f"  {phase['kind']:<6} {phase['name']:<40} {phase['seconds']:8.3f}")
+        for kind, total in report["totals"].items():
+            lines.append(f"  total {kind:<41} {total:8.3f}")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
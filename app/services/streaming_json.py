@@ -0,0 +1,146 @@
+# app/services/streaming_json.py
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Characters that change the parser's state outside strings, and inside them;
+# the text between them is skipped in bulk by the regex engine
+_STRUCTURAL_RE = re.compile(r'["{}\[\]:,]')
+_IN_STRING_RE = re.compile(r'["\\]')
+
+# (chunk index, offset) of a position in the streamed text
+_Position = Tuple[int, int]
+
+
+class StreamingArrayParser:
+    """Incrementally parse a JSON object streamed in chunks, handing out each
+    element of one of its top-level arrays as soon as that element is complete.
+
+    Built for LLM replies like {"resource_list": [...], "lesson_plan": "..."}.
+    Anything before the first "{" is skipped, such as a Markdown fence, a bare
+    "json" line or a sentence of prose, and so is anything after the object
+    closes. An element that isn't valid JSON by itself is dropped without
+    stopping the parse. close() decodes the whole object at the end.
+    """
+
+    def __init__(self, array_key: str, on_item: Optional[Callable[[Any], None]] = None):
+        self.array_key = array_key
+        self.on_item = on_item
+        self.items: List[Any] = []
+        self.skipped_items = 0
+
+        self._chunks: List[str] = []  # the object's text, starting at its opening brace
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect_key = False  # inside the top-level object, before a key's colon
+
+        self._key_start: Optional[_Position] = None
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[_Position] = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the top-level object's closing brace has been seen"""
+        return self._finished
+
+    def _slice(self, start: _Position, end: _Position) -> str:
+        (first, begin), (last, stop) = start, end
+        if first == last:
+            return self._chunks[first][begin:stop]
+        return self._chunks[first][begin:] + ''.join(self._chunks[first + 1:last]) + self._chunks[last][:stop]
+
+    def _emit(self, text: str, completed: List[Any]):
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.skipped_items += 1
+            return
+        self.items.append(item)
+        completed.append(item)
+        if self.on_item is not None:
+            self.on_item(item)
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next piece of text; returns the array elements it completed"""
+        if self._finished or not chunk:
+            return []
+        if not self._started:
+            brace = chunk.find('{')
+            if brace < 0:
+                return []
+            chunk = chunk[brace:]
+            self._started = True
+
+        index_of_chunk = len(self._chunks)
+        self._chunks.append(chunk)
+        completed: List[Any] = []
+        pos, end = 0, len(chunk)
+
+        while pos < end:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    pos += 1
+                    continue
+                match = _IN_STRING_RE.search(chunk, pos)
+                if match is None:
+                    break
+                pos = match.end()
+                if match.group() == '\\':
+                    self._escaped = True
+                    continue
+                self._in_string = False
+                if self._key_start is not None:
+                    key_text = self._slice(self._key_start, (index_of_chunk, pos))
+                    self._key_start = None
+                    try:
+                        self._last_key = json.loads(key_text)
+                    except ValueError:
+                        self._last_key = None
+                continue
+
+            match = _STRUCTURAL_RE.search(chunk, pos)
+            if match is None:
+                break
+            index, char = match.start(), match.group()
+            pos = index + 1
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = (index_of_chunk, index)
+            elif char in '{[':
+                if self._depth == self._array_depth and self._item_start is None:
+                    self._item_start = (index_of_chunk, index)
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 2 and char == '[' and self._last_key == self.array_key:
+                    self._array_depth = 2
+            elif char in '}]':
+                self._depth -= 1
+                if self._array_depth is not None:
+                    if self._depth == self._array_depth and self._item_start is not None:
+                        self._emit(self._slice(self._item_start, (index_of_chunk, pos)), completed)
+                        self._item_start = None
+                    elif self._depth < self._array_depth:
+                        self._array_depth = None
+                if self._depth == 0:
+                    self._chunks[index_of_chunk] = chunk[:pos]
+                    self._finished = True
+                    break
+            elif self._depth == 1:
+                # ',' starts the next key, ':' ends the current one
+                self._expect_key = char == ','
+
+        return completed
+
+    def close(self) -> Dict:
+        """Decode the complete object; raises ValueError if the stream didn't contain one"""
+        if not self._started:
+            raise ValueError("no JSON object found in the response")
+        return json.loads(''.join(self._chunks))
@@ -0,0 +1,49 @@
+# app/services/text_similarity.py
+import re
+from typing import List
+
+# Words that name the same thing in image descriptions; mapped to one form so
+# "kids" and "children" don't make two otherwise identical prompts look different
+_CANONICAL_WORDS = {
+    "kids": "child", "kid": "child", "children": "child", "students": "child",
+    "student": "child", "pupils": "child", "pupil": "child", "learners": "child",
+    "teachers": "teacher", "pictures": "picture", "images": "picture", "image": "picture",
+    "photo": "picture", "photos": "picture",
+}
+_STOP_WORDS = {"a", "an", "the", "of", "and", "with", "in", "on", "to", "for", "at", "some"}
+# Splits on whitespace and punctuation only; \w would break Devanagari words at their vowel signs
+_WORD_RE = re.compile(r"[^\s!-/:-@\[-`{-~।]+")
+
+
+def split_words(text: str) -> List[str]:
+    """Words of text, for English and Devanagari alike ("किताब पढ़ना" -> ["किताब", "पढ़ना"])"""
+    return _WORD_RE.findall(text)
+
+
+def _normalize_words(text: str) -> List[str]:
+    words = []
+    for word in split_words(text.lower()):
+        if word in _STOP_WORDS:
+            continue
+        word = _CANONICAL_WORDS.get(word, word)
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def shingles(text: str, size: int = 4) -> set:
+    """Character shingles over the normalized words with spaces removed.
+
+    Joining the words makes "flash cards" and "flashcards" share their shingles.
+    """
+    joined = ''.join(_normalize_words(text))
+    if len(joined) <= size:
+        return {joined} if joined else set()
+    return {joined[i:i + size] for i in range(len(joined) - size + 1)}
+
+
+def jaccard(first: set, second: set) -> float:
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
@@ -1,35 +1,125 @@
 # app/services/visual_document_generator.py
 import json
 import re
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 from pathlib import Path
 import base64
-import hashlib
+import importlib.util
+import io
+import threading
 from dotenv import load_dotenv
-from google.cloud import storage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.services.clients import get_or_create, get_prediction_client, get_storage_client, init_vertex_ai
+from app.services.model_router import route_chat_model
 import os
-from jinja2 import Template
+from app.services.prompt_templates import render_prompt
+from app.services.artifact_store import DOCX_MIMETYPE, artifact_store
+from app.services.image_cache import image_cache, make_image_key
+from app.services.lesson_sections import LessonOutline, Section, normalize_section_key, tokenize_lesson_plan
+from app.services.text_similarity import jaccard, shingles
+from app.services.media_uploader import get_media_uploader
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
-
+# Importing aiplatform takes seconds, so only check that it is installed; the
+# clients module imports it when the first generator is built
 try:
-    from google.cloud import aiplatform
-    from google.cloud.aiplatform.gapic.schema import predict
-    VERTEX_AI_AVAILABLE = True
-except ImportError:
+    VERTEX_AI_AVAILABLE = importlib.util.find_spec("google.cloud.aiplatform") is not None
+except ModuleNotFoundError:  # google.cloud itself is missing
     VERTEX_AI_AVAILABLE = False
+if not VERTEX_AI_AVAILABLE:
     print("Warning: google-cloud-aiplatform not installed. Image generation will be disabled.")
 
-from docx import Document
-from docx.shared import Inches
-from langchain_google_genai import ChatGoogleGenerativeAI
+# Phrases in a lesson plan that call for a picture, scanned in one pass. Each
+# alternative captures a bounded description ending at a sentence terminator
+# (including the Devanagari danda) or the next instruction word, so plans
+# without full stops can't drag a match across the rest of the document.
+_VISUAL_CUE_PATTERN = r"""
+      show\ a\ picture\ of\ (?P<hook>.{1,200}?)(?:[.।]|ask|show)
+    | picture\ story\ with\ (?P<story>.{1,200}?)(?:[.।]|ask)
+    | display\ (?P<display>.{1,200}?)(?:[.।"])
+    | \(e\.g\.,\s*(?P<example>[^)]{1,200}?)\)
+    | use\ (?P<activity>.{0,120}?pictures?.{1,120}?)(?:[.।]|use|show)
+    | flashcards\ with\ (?P<flashcard>.{1,200}?)(?:[.।]|play)
+"""
+# Run against a lower-cased copy of the plan, which avoids slow case-insensitive scanning
+_VISUAL_CUE_RE = re.compile(_VISUAL_CUE_PATTERN, re.DOTALL | re.VERBOSE)
+_VISUAL_CUE_RE_ANY_CASE = re.compile(_VISUAL_CUE_PATTERN, re.DOTALL | re.VERBOSE | re.IGNORECASE)
+# Cues that must start a word ("because ..." is not "use ..."); checked after
+# matching, since a \b in the pattern defeats the regex engine's prefix scan
+_WORD_START_CUES = {"display", "activity"}
+_VISUAL_CUE_SECTIONS = {
+    "hook": "Hook Activity",
+    "story": "Picture Story",
+    "display": "Display Material",
+    "example": "Example Visual",
+    "activity": "Activity Material",
+    "flashcard": "Flashcard Material",
+}
+
+# "cascade" runs the rules first and asks the LLM only about sections they left
+# without a visual; "full" always sends the whole plan to the LLM as well
+VISUAL_EXTRACTION_MODE = os.getenv('VISUAL_EXTRACTION_MODE', 'cascade').lower()
+# Fraction of lesson sections that must have a visual before the LLM is skipped
+VISUAL_COVERAGE_TARGET = float(os.getenv('VISUAL_COVERAGE_TARGET', 0.5))
+# Shingle Jaccard similarity at which two image descriptions count as the same picture
+VISUAL_NEAR_DUP_THRESHOLD = float(os.getenv('VISUAL_NEAR_DUP_THRESHOLD', 0.6))
+
+_extraction_stats = {
+    "requests": 0, "llm_skipped": 0, "llm_partial": 0, "llm_full": 0, "sections_sent_to_llm": 0,
+    "duplicates_merged": 0, "same_section_merged": 0,
+}
+_extraction_stats_lock = threading.Lock()
+
+
+def _count_extraction(**increments):
+    with _extraction_stats_lock:
+        for name, amount in increments.items():
+            _extraction_stats[name] += amount
+
+
+def get_extraction_stats() -> Dict:
+    with _extraction_stats_lock:
+        stats = dict(_extraction_stats)
+    stats["llm_skip_rate"] = round(stats["llm_skipped"] / stats["requests"], 4) if stats["requests"] else 0.0
+    stats["mode"] = VISUAL_EXTRACTION_MODE
+    stats["coverage_target"] = VISUAL_COVERAGE_TARGET
+    stats["near_dup_threshold"] = VISUAL_NEAR_DUP_THRESHOLD
+    return stats
+
+
+def find_visual_cues(lesson_plan: str) -> List[Tuple[str, str, int]]:
+    """(cue, description, offset) for each phrase asking for a picture, in document order"""
+    lowered = lesson_plan.lower()
+    if len(lowered) == len(lesson_plan):
+        cue_re, haystack = _VISUAL_CUE_RE, lowered
+    else:
+        # Lower-casing shifted some offsets; fall back to a case-insensitive scan
+        cue_re, haystack = _VISUAL_CUE_RE_ANY_CASE, lesson_plan
+
+    cues = []
+    cue_ends = {}
+    position = 0
+    while True:
+        match = cue_re.search(haystack, position)
+        if match is None:
+            break
+        cue = match.lastgroup
+        start = match.start()
+        if cue in _WORD_START_CUES and start > 0 and haystack[start - 1].isalnum():
+            position = start + 1
+            continue
+        # Resume right after the cue phrase so one description may contain a different cue,
+        # but never report a cue inside an earlier match of the same kind
+        position = match.start(cue)
+        if start < cue_ends.get(cue, 0):
+            continue
+        cue_ends[cue] = match.end()
+        description = lesson_plan[match.start(cue):match.end(cue)].strip()
+        if len(description) > 5:
+            cues.append((cue, description, start))
+    return cues
+
 
 @dataclass
 class ImageRequirement:
@@ -37,6 +127,12 @@ class ImageRequirement:
     description: str
     prompt: str
     image_path: Optional[str] = None
+    section_key: Optional[str] = None  # key of the lesson plan section the image belongs to
+    shared_sections: List[str] = field(default_factory=list)  # every section key this image is used for
+
+    @property
+    def image_key(self) -> str:
+        return self.section_key or normalize_section_key(self.section)
 
 class VisualDocumentGenerator:
     def __init__(self, gemini_api_key: str, project_id: str, location: str = "us-central1"):
@@ -47,73 +143,90 @@ class VisualDocumentGenerator:
         if not VERTEX_AI_AVAILABLE:
             raise ImportError("google-cloud-aiplatform package is required for image generation.")
         
-        # Initialize Vertex AI
-        aiplatform.init(project=project_id, location=location)
-        
-        # Initialize LLM for text processing
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            google_api_key=gemini_api_key
-        )
+        # Initialize Vertex AI (once per process)
+        init_vertex_ai(project_id, location)
         
-        # Initialize Vertex AI client for image generation
-        self.prediction_client = aiplatform.gapic.PredictionServiceClient()
+        # Shared Vertex AI client for image generation; its gRPC channel is reused across requests
+        self.prediction_client = get_prediction_client(location)
         
         # Vertex AI Image Generation endpoint
         # Replace with your actual deployed model endpoint
         # self.image_endpoint = f"projects/{project_id}/locations/{location}/endpoints/YOUR_ENDPOINT_ID"
-        self.image_endpoint = f"projects/{self.project_id}/locations/{self.location}/publishers/google/models/imagen-4.0-generate-preview-06-06"
+        self.image_model = "imagen-4.0-generate-preview-06-06"
+        self.image_endpoint = f"projects/{self.project_id}/locations/{self.location}/publishers/google/models/{self.image_model}"
     
+    @property
+    def storage_client(self):
+        """Shared Cloud Storage client for uploads"""
+        return get_storage_client(self.project_id)
+
     def extract_image_requirements(self, lesson_plan: str) -> List[ImageRequirement]:
-        """Extract sections that need visual content using multiple approaches"""
+        """Extract sections that need visual content, rules first and the LLM only where needed"""
         requirements = []
+        outline = LessonOutline(lesson_plan)
         
         # Method 1: Rule-based extraction
-        rule_based_requirements = self._extract_by_rules(lesson_plan)
+        rule_based_requirements = self._extract_by_rules(lesson_plan, outline)
         requirements.extend(rule_based_requirements)
         
-        # Method 2: LLM-based extraction  
-        llm_requirements = self._extract_by_llm(lesson_plan)
+        # Method 2: LLM-based extraction, limited to sections the rules didn't cover
+        content_sections = [section for section in outline.sections if section.has_body]
+        if VISUAL_EXTRACTION_MODE == 'full' or not content_sections:
+            _count_extraction(requests=1, llm_full=1)
+            llm_requirements = self._extract_by_llm(lesson_plan, outline)
+        else:
+            covered = {req.section_key for req in rule_based_requirements}
+            uncovered = [section for section in content_sections if section.key not in covered]
+            coverage = 1 - len(uncovered) / len(content_sections)
+            if coverage >= VISUAL_COVERAGE_TARGET:
+                print(f"Rule-based visuals cover {coverage:.0%} of sections; skipping LLM extraction")
+                _count_extraction(requests=1, llm_skipped=1)
+                llm_requirements = []
+            else:
+                _count_extraction(requests=1, llm_partial=1, sections_sent_to_llm=len(uncovered))
+                llm_requirements = self._extract_by_llm(lesson_plan, outline, uncovered)
         requirements.extend(llm_requirements)
         
         # Remove duplicates and return
         unique_requirements = self._remove_duplicates(requirements)
         return unique_requirements
     
-    def _extract_by_rules(self, lesson_plan: str) -> List[ImageRequirement]:
+    def _extract_by_rules(self, lesson_plan: str, outline: LessonOutline) -> List[ImageRequirement]:
         """Rule-based extraction for common visual content patterns"""
         requirements = []
+        counts = {}
         
-        # Common patterns that indicate visual content needs
-        visual_patterns = [
-            (r"Show a picture of (.+?)(?:\.|Ask|Show)", "Hook Activity"),
-            (r"picture story with (.+?)(?:\.|Ask)", "Picture Story"),
-            (r"Display (.+?)(?:\.|\")", "Display Material"),
-            (r"\(e\.g\.,\s*(.+?)\)", "Example Visual"),
-            (r"[Uu]se (.+?pictures?.+?)(?:\.|Use|Show)", "Activity Material"),
-            (r"flashcards with (.+?)(?:\.|Play)", "Flashcard Material"),
-        ]
-        
-        for pattern, section_type in visual_patterns:
-            matches = re.findall(pattern, lesson_plan, re.IGNORECASE | re.DOTALL)
-            for i, match in enumerate(matches):
-                description = match.strip()
-                if len(description) > 5:
-                    requirements.append(ImageRequirement(
-                        section=f"{section_type} {i+1}",
-                        description=description,
-                        prompt=self._generate_image_prompt(description)
-                    ))
+        for cue, description, offset in find_visual_cues(lesson_plan):
+            counts[cue] = counts.get(cue, 0) + 1
+            section = outline.section_at(offset)
+            requirements.append(ImageRequirement(
+                section=f"{_VISUAL_CUE_SECTIONS[cue]} {counts[cue]}",
+                description=description,
+                prompt=self._generate_image_prompt(description),
+                section_key=section.key if section else None
+            ))
         
         return requirements
     
-    def _extract_by_llm(self, lesson_plan: str) -> List[ImageRequirement]:
-        """LLM-based extraction with improved prompting"""
+    def _extract_by_llm(self, lesson_plan: str, outline: LessonOutline,
+                        sections: Optional[List[Section]] = None) -> List[ImageRequirement]:
+        """LLM-based extraction with improved prompting; sections limits it to part of the plan"""
+        section_ids = {}
+        if sections:
+            # Label each excerpt with its section key so answers map back to the right
+            # section even when a title such as "Practice" repeats across days
+            excerpt = '\n\n'.join(f"Section id: {section.key}\n{section.title}\n{section.body}" for section in sections)
+            section_ids = {section.key: section for section in sections}
+            section_hint = 'Use the "Section id" of the part you are describing as "section".'
+        else:
+            excerpt = lesson_plan
+            section_hint = ''
+
         extraction_prompt = f"""
         Analyze this lesson plan and identify sections that need visual content.
 
         LESSON PLAN:
-        {lesson_plan}
+        {excerpt}
 
         Find mentions of:
         - Pictures to show students
@@ -126,10 +239,12 @@ class VisualDocumentGenerator:
             {{"section": "Hook Activity", "description": "festival scene"}},
             {{"section": "Teaching Example", "description": "child with ice cream"}}
         ]
+        {section_hint}
         """
         
         try:
-            response = self.llm.invoke([{"role": "user", "content": extraction_prompt}])
+            messages = [{"role": "user", "content": extraction_prompt}]
+            response = route_chat_model("visual_extraction", messages, self.gemini_api_key).invoke(messages)
             content = response.content.strip()
             
             print(f"Raw LLM response: {content[:200]}...")
@@ -149,10 +264,18 @@ class VisualDocumentGenerator:
                                 section = str(req["section"])
                                 description = str(req["description"])
                                 
+                                section_id = section.strip()
+                                if section_id in section_ids:
+                                    section_key = section_id
+                                    section = section_ids[section_id].title
+                                else:
+                                    section_key = outline.key_for_title(section)
+                                
                                 processed_requirements.append(ImageRequirement(
                                     section=section,
                                     description=description,
-                                    prompt=self._generate_image_prompt(description)
+                                    prompt=self._generate_image_prompt(description),
+                                    section_key=section_key
                                 ))
                         
                         return processed_requirements
@@ -166,16 +289,43 @@ class VisualDocumentGenerator:
         return []
     
     def _remove_duplicates(self, requirements: List[ImageRequirement]) -> List[ImageRequirement]:
-        """Remove duplicate requirements"""
+        """Collapse requirements that would produce the same picture or an unused one.
+
+        A requirement whose description matches (or nearly matches, by shingle
+        similarity) an earlier one is merged into it, and that image is then used
+        for both sections. A requirement for a section that already has an image
+        is dropped, since the document shows one image per section.
+        """
         unique_requirements = []
-        seen_descriptions = set()
+        fingerprints = []
+        covered_sections = set()
+        duplicates = same_section = 0
         
         for req in requirements:
+            key = req.image_key
             normalized = req.description.lower().strip()
-            if normalized not in seen_descriptions:
+            fingerprint = shingles(req.description)
+            
+            match = None
+            for kept, (kept_normalized, kept_fingerprint) in zip(unique_requirements, fingerprints):
+                if normalized == kept_normalized or jaccard(fingerprint, kept_fingerprint) >= VISUAL_NEAR_DUP_THRESHOLD:
+                    match = kept
+                    break
+            
+            if match is not None:
+                duplicates += 1
+                if key not in covered_sections:
+                    match.shared_sections.append(key)
+                    covered_sections.add(key)
+            elif key in covered_sections:
+                same_section += 1
+            else:
+                req.shared_sections = [key]
+                covered_sections.add(key)
                 unique_requirements.append(req)
-                seen_descriptions.add(normalized)
+                fingerprints.append((normalized, fingerprint))
         
+        _count_extraction(duplicates_merged=duplicates, same_section_merged=same_section)
         return unique_requirements
     
     def _generate_image_prompt(self, description: str) -> str:
@@ -242,12 +392,8 @@ class VisualDocumentGenerator:
     def create_audio_storage_bucket(self, prompt: str, section_name: str) -> Optional[str]:
         """Generate audio using Vertex AI and upload to Google Cloud Storage (UBLA compatible)"""
         try:
-            prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'generate_audio_text.md')
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                raw_prompt = f.read()
-
-            template = Template(raw_prompt)
-            rendered_prompt = template.render(
+            rendered_prompt = render_prompt(
+                'generate_audio_text.md',
                 description=prompt
             )
             
@@ -259,12 +405,11 @@ class VisualDocumentGenerator:
                 # "personGeneration": "allow_adult"
             }
             
-            response = llm.invoke(prompt)
+            response = route_chat_model("audio_suggestions", prompt, self.gemini_api_key).invoke(prompt)
             
-            # Initialize Google Cloud Storage client
-            storage_client = storage.Client(project=self.project_id)
+            # Reuse the shared Google Cloud Storage client
             bucket_name = "attendance-262725"  # Use your existing bucket
-            bucket = storage_client.bucket(bucket_name)
+            bucket = self.storage_client.bucket(bucket_name)
             
             # print(response.predictions)
             return None
@@ -276,8 +421,6 @@ class VisualDocumentGenerator:
     def create_image_storage_bucket(self, prompt: str, section_name: str) -> Optional[str]:
         """Generate image using Vertex AI and upload to Google Cloud Storage (UBLA compatible)"""
         try:
-            from google.cloud import storage
-            
             # Your existing Vertex AI code...
             instances = [{"prompt": prompt}]
             parameters = {
@@ -293,12 +436,7 @@ class VisualDocumentGenerator:
                 parameters=parameters
             )
             
-            # Initialize Google Cloud Storage client
-            storage_client = storage.Client(project=self.project_id)
-            bucket_name = "attendance-262725"  # Use your existing bucket
-            bucket = storage_client.bucket(bucket_name)
-            
-            # Process response and upload
+            # Process response and hand off to the background uploader
             for i, prediction in enumerate(response.predictions):
                 image_data = None
                 if "bytesBase64Encoded" in prediction:
@@ -310,24 +448,10 @@ class VisualDocumentGenerator:
                     # Decode image
                     image_bytes = base64.b64decode(image_data)
                     
-                    # Create unique blob name
-                    import time
-                    timestamp = int(time.time())
-                    filename_hash = hashlib.md5(prompt.encode()).hexdigest()[:8]
-                    blob_name = f"lesson-images/{section_name.replace(' ', '_').lower()}_{filename_hash}_{timestamp}.png"
-                    
-                    # Upload to Google Cloud Storage WITHOUT ACL operations
-                    blob = bucket.blob(blob_name)
-                    blob.upload_from_string(
-                        image_bytes,
-                        content_type='image/png'
-                    )
+                    # Blob name is the content hash, so the URL is known before the upload finishes
+                    public_url = get_media_uploader().enqueue(image_bytes, content_type='image/png')
                     
-                    # DO NOT call blob.make_public() - this uses ACLs
-                    # Instead, construct public URL directly
-                    public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
-                    
-                    print(f"Generated image uploaded to: {public_url}")
+                    print(f"Generated image queued for upload to: {public_url}")
                     return public_url
             
             return None
@@ -336,10 +460,21 @@ class VisualDocumentGenerator:
             print(f"Error generating/uploading image: {str(e)}")
             return None
 
-    def generate_image(self, prompt: str, section_name: str) -> Optional[str]:
-        """Generate image using Vertex AI Image Generation"""
+    def generate_image(self, prompt: str, section_name: str, timeout: Optional[float] = None, style: Optional[str] = None) -> Optional[str]:
+        """Generate image using Vertex AI Image Generation; timeout bounds the predict call in seconds.
+
+        Returns the image path, or None if the response held no image. Errors are raised.
+        """
         try:
             # print(f"Generating image with prompt: {prompt[:100]}...")
+            aspect_ratio = "1:1"  # Square images work well for educational content
+
+            # Identical prompts recur across lessons; reuse the stored image when we have it
+            cache_key = make_image_key(prompt, self.image_model, aspect_ratio, style)
+            cached_path = image_cache.get(cache_key)
+            if cached_path:
+                print(f"Reusing cached image for {section_name}: {cached_path}")
+                return cached_path
             
             # Prepare the request for Vertex AI
             instances = [
@@ -351,7 +486,7 @@ class VisualDocumentGenerator:
             # Optional parameters - adjust based on your model
             parameters = {
                 "sampleCount": 1,
-                "aspectRatio": "1:1",  # Square images work well for educational content
+                "aspectRatio": aspect_ratio,
                 "safetyFilterLevel": "block_some",
                 "personGeneration": "allow_adult"
             }
@@ -360,13 +495,10 @@ class VisualDocumentGenerator:
             response = self.prediction_client.predict(
                 endpoint=self.image_endpoint,
                 instances=instances,
-                parameters=parameters
+                parameters=parameters,
+                timeout=timeout
             )
             
-            # Create output directory
-            output_dir = Path("generated_images")
-            output_dir.mkdir(exist_ok=True)
-            
             # Process the response
             for i, prediction in enumerate(response.predictions):
                 # The response structure may vary depending on the model
@@ -384,97 +516,65 @@ class VisualDocumentGenerator:
                     # Decode base64 image
                     image_bytes = base64.b64decode(image_data)
                     
-                    # Generate unique filename
-                    filename_hash = hashlib.md5(prompt.encode()).hexdigest()[:8]
-                    image_path = output_dir / f"{section_name.replace(' ', '_').lower()}_{filename_hash}.png"
-                    
-                    # Save the image
-                    with open(image_path, "wb") as f:
-                        f.write(image_bytes)
+                    # Save into the content-addressed cache (evicts old images past the byte budget)
+                    image_path = image_cache.put(cache_key, image_bytes, '.png')
                     
                     print(f"Generated image saved to: {image_path}")
-                    return str(image_path)
+                    return image_path
             
             print("No image data found in response")
             return None
             
         except Exception as e:
             print(f"Error generating image for {section_name}: {str(e)}")
-            # Create a fallback text file for debugging
-            output_dir = Path("generated_images")
-            output_dir.mkdir(exist_ok=True)
-            
-            filename_hash = hashlib.md5(prompt.encode()).hexdigest()[:8]
-            fallback_path = output_dir / f"{section_name.replace(' ', '_').lower()}_{filename_hash}_error.txt"
-            
-            with open(fallback_path, 'w') as f:
-                f.write(f"Image generation failed\nPrompt: {prompt}\nSection: {section_name}\nError: {str(e)}")
-            
-            return str(fallback_path)
+            # The image pipeline reports the cause and leaves this section's image out
+            raise
     
     def create_visual_document(self, lesson_plan: str, images: Dict[str, str]) -> str:
-        """Create Word document with integrated images"""
+        """Create Word document with integrated images; returns the artifact filename to download"""
+        from docx import Document
+        from docx.shared import Inches
+
         doc = Document()
         doc.add_heading('Visual Lesson Plan', 0)
         
-        sections = self._parse_lesson_sections(lesson_plan)
-        
-        for section_title, content in sections.items():
-            doc.add_heading(section_title, level=1)
-            doc.add_paragraph(content)
+        for section in tokenize_lesson_plan(lesson_plan):
+            doc.add_heading(section.title, level=section.level)
+            if section.has_body:
+                doc.add_paragraph(section.body)
             
             # Add actual image if available and it's a valid image file
-            section_key = section_title.replace(' ', '_').lower()
-            # print("Sections:", list(sections.keys()))
-            # print("Image keys:", list(images.keys()))
-            if section_key in images and images[section_key]:
-                image_path = images[section_key]
+            image_path = images.get(section.key)
+            if image_path:
                 if Path(image_path).exists() and image_path.endswith(('.png', '.jpg', '.jpeg')):
                     try:
                         # Add the actual image to the document
                         doc.add_picture(image_path, width=Inches(4))
-                        doc.add_paragraph(f"Generated image for: {section_title}")
+                        doc.add_paragraph(f"Generated image for: {section.title}")
                     except Exception as e:
                         doc.add_paragraph(f"[Image generation error: {str(e)}]")
                         doc.add_paragraph(f"Image file: {image_path}")
                 else:
-                    doc.add_paragraph(f"[Visual Content: {section_title}]")
+                    doc.add_paragraph(f"[Visual Content: {section.title}]")
                     doc.add_paragraph(f"Image file: {image_path}")
                 
                 doc.add_paragraph()
         
-        output_path = "visual_lesson_plan.docx"
-        doc.save(output_path)
-        return output_path
-    
-    def _parse_lesson_sections(self, lesson_plan: str) -> Dict[str, str]:
-        """Parse lesson plan into sections"""
-        sections = {}
-        current_section = "Overview"
-        current_content = []
-        
-        for line in lesson_plan.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check for section headers
-            if (line.startswith('**') and line.endswith('**') or
-                line.startswith('#') or 
-                line.endswith(':') or
-                any(keyword in line.lower() for keyword in ['hook', 'objective', 'instruction', 'practice'])):
-                
-                # Save previous section
-                if current_content:
-                    sections[current_section] = '\n'.join(current_content)
-                
-                current_section = line.strip('*#:').strip()
-                current_content = []
-            else:
-                current_content.append(line)
-        
-        # Save last section
-        if current_content:
-            sections[current_section] = '\n'.join(current_content)
-        
-        return sections
\ No newline at end of file
+        # Render in memory under a per-request name so concurrent requests never share a file
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return artifact_store.put(buffer.getvalue(), 'visual_lesson_plan', '.docx', DOCX_MIMETYPE)
+
+
+def get_visual_document_generator(gemini_api_key: str = None, project_id: str = None, location: str = "us-central1") -> VisualDocumentGenerator:
+    """Shared, lazily constructed VisualDocumentGenerator.
+
+    The generator holds no per-request state, so one instance (and its Vertex AI,
+    Gemini and Storage clients) is safely reused by concurrent requests.
+    """
+    gemini_api_key = gemini_api_key or os.getenv("GOOGLE_API_KEY")
+    project_id = project_id or os.getenv("GCP_PROJECT_ID")
+    return get_or_create(
+        ("visual_document_generator", gemini_api_key, project_id, location),
+        lambda: VisualDocumentGenerator(gemini_api_key, project_id=project_id, location=location)
+    )
@@ -0,0 +1,135 @@
+# app/services/visual_jobs.py
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Nodes a visual lesson passes through, used to report step N of M
+VISUAL_WORKFLOW_STEPS = 4
+
+
+class JobQueueFull(Exception):
+    """Raised when the job backlog is at capacity"""
+
+
+@dataclass
+class Job:
+    job_id: str
+    status: str = "queued"  # queued, running, succeeded, failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    completed_nodes: List[Dict] = field(default_factory=list)
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        data = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "completed_nodes": list(self.completed_nodes),
+                "current_step": len(self.completed_nodes),
+                "total_steps": VISUAL_WORKFLOW_STEPS,
+            },
+        }
+        if self.status == "succeeded":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Runs long workflow requests on a bounded worker pool and keeps results for a while"""
+
+    def __init__(self, max_workers: int, max_pending: int, retention_seconds: float):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="visual-job")
+        return self._executor
+
+    def submit(self, run: Callable[[Callable[[str], None]], Dict]) -> Job:
+        """Queue run(report_node) and return the job; report_node records per-node progress.
+
+        Raises JobQueueFull when queued + running jobs already reach max_pending.
+        """
+        with self._lock:
+            self._purge_expired()
+            active = sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+            if active >= self.max_pending:
+                raise JobQueueFull(f"{active} jobs already queued or running")
+            job = Job(job_id=uuid.uuid4().hex)
+            self._jobs[job.job_id] = job
+            executor = self._get_executor()
+
+        executor.submit(self._run, job, run)
+        return job
+
+    def _run(self, job: Job, run: Callable[[Callable[[str], None]], Dict]):
+        with self._lock:
+            job.status = "running"
+            job.started_at = time.time()
+
+        def report_node(node: str):
+            with self._lock:
+                job.completed_nodes.append({"node": node, "finished_at": time.time()})
+
+        try:
+            result = run(report_node)
+            with self._lock:
+                job.result = result
+                job.status = "succeeded"
+        except Exception as e:
+            print(f"Visual lesson job {job.job_id} failed: {e}")
+            with self._lock:
+                job.error = str(e)
+                job.status = "failed"
+        finally:
+            with self._lock:
+                job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job, or None if it is unknown or its result has expired"""
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["max_workers"] = self.max_workers
+        counts["max_pending"] = self.max_pending
+        return counts
+
+
+visual_job_manager = JobManager(
+    max_workers=int(os.getenv('VISUAL_JOB_WORKERS', 4)),
+    max_pending=int(os.getenv('VISUAL_JOB_MAX_PENDING', 50)),
+    retention_seconds=float(os.getenv('VISUAL_JOB_RETENTION_SECONDS', 3600))
+)
@@ -1,19 +1,20 @@
 # app/services/visual_workflow_nodes.py
-from app.services.visual_document_generator import VisualDocumentGenerator
+from app.services.visual_document_generator import get_visual_document_generator
+from app.services.image_pipeline import generate_images
 from app.services.lesson_generator import AgentState
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.services.model_router import route_chat_model
+from app.services.lesson_stream import message_text
+from app.services.streaming_json import StreamingArrayParser
 from dotenv import load_dotenv
-from jinja2 import Template
-import re
+from langgraph.config import get_stream_writer
+from app.services.prompt_templates import render_prompt
 import os
-import json
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+def get_llm(prompt: str = ""):
+    """Gemini model for the resource-mapping call, chosen by the "resource_mapping" route"""
+    return route_chat_model("resource_mapping", prompt)
 
 def should_generate_visuals(state: AgentState) -> str:
     """Determine if visual document should be generated"""
@@ -51,44 +52,52 @@ def process_lesson_plan(state: AgentState) -> str:
     state['lesson_plan'] = lesson_plan_text
     return state
 
+def _resource_writer():
+    """LangGraph's custom stream writer, or None when the node runs outside a graph"""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
 def generate_resources(state: AgentState) -> AgentState:
     if not state.get("lesson_plan"):
         state["visual_generation_errors"] = ["No lesson plan available for visual generation"]
         return state
     
     try:
-        prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'generate_lesson_plan_resources.md')
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            raw_prompt = f.read()
-
-        template = Template(raw_prompt)
-        rendered_prompt = template.render(
+        rendered_prompt = render_prompt(
+            'generate_lesson_plan_resources.md',
             lesson_plan=state.get("lesson_plan")
         )
         prompt = f"<pre>{rendered_prompt}</pre>"
-        # print(prompt)
 
-        response = llm.invoke(prompt)
-        # print(response.content)
-        # outer = json.loads(response.content)
-        # inner_content_raw = outer['content']
+        # Stream the reply so each resource is announced as soon as its entry
+        # is complete (the "resource" event in lesson_stream) instead of after
+        # the whole lesson plan has been echoed back
+        writer = _resource_writer()
+        parser = StreamingArrayParser(
+            "resource_list",
+            on_item=(lambda resource: writer({"resource": resource})) if writer else None
+        )
+        for chunk in get_llm(prompt).stream(prompt):
+            parser.feed(message_text(chunk.content))
 
-        if response.content.startswith("```json"):
-            inner_content_raw = response.content
-            inner_content_raw = inner_content_raw.strip("```json").strip("```").strip()
-        lesson_data = json.loads(inner_content_raw)
-        # print(lesson_data)
-        
-        state["resources"] = lesson_data['resource_list']
-        state["lesson_plan_with_resource_mapping"] = lesson_data['lesson_plan']
+        try:
+            lesson_data = parser.close()
+            state["resources"] = lesson_data['resource_list']
+            state["lesson_plan_with_resource_mapping"] = lesson_data['lesson_plan']
+        except (ValueError, KeyError, TypeError) as e:
+            # Truncated or malformed reply: keep the resources that did arrive whole
+            print(f"Could not parse resource mapping ({e}); {len(parser.items)} resources recovered")
+            state["resources"] = [item for item in parser.items if isinstance(item, dict)]
+            state["lesson_plan_with_resource_mapping"] = state.get("lesson_plan", "")
     except Exception as e:
         print(str(e))
 
     return state
 
 def generate_content(state: AgentState) -> AgentState:
-    generator = VisualDocumentGenerator(os.getenv("GOOGLE_API_KEY"),
-            project_id=os.getenv("GCP_PROJECT_ID"))
+    generator = get_visual_document_generator(os.getenv("GOOGLE_API_KEY"), os.getenv("GCP_PROJECT_ID"))
     resources = generator.generate_content(state["resources"])
     state["resources"] = resources
     return state
@@ -102,8 +111,7 @@ def extract_visual_requirements(state: AgentState) -> AgentState:
         return state
     
     try:
-        generator = VisualDocumentGenerator(os.getenv("GOOGLE_API_KEY"),
-            project_id=os.getenv("GCP_PROJECT_ID"))
+        generator = get_visual_document_generator(os.getenv("GOOGLE_API_KEY"), os.getenv("GCP_PROJECT_ID"))
         requirements = generator.extract_image_requirements(state["lesson_plan"])
         
         if not requirements:
@@ -131,6 +139,8 @@ def extract_visual_requirements(state: AgentState) -> AgentState:
             state["image_requirements"] = [
                 {
                     "section": req.section,
+                    "section_key": req.section_key,
+                    "shared_sections": req.shared_sections,
                     "description": req.description,
                     "prompt": req.prompt
                 }
@@ -153,44 +163,25 @@ def extract_visual_requirements(state: AgentState) -> AgentState:
     
     return state
 
-def normalize_section_key(title):
-    key = title.strip().lower()
-    key = re.sub(r'[^a-z0-9]+', '_', key)
-    return key.strip('_')
-
 def generate_visual_content(state: AgentState) -> AgentState:
     """Generate images and create visual document"""
-    # if not state.get("image_requirements"):
-    #     state["visual_generation_errors"] = ["No image requirements found"]
-    #     return state
-    
     try:
-        generator = VisualDocumentGenerator(os.getenv("GOOGLE_API_KEY"),
-            os.getenv("GCP_PROJECT_ID"))
+        generator = get_visual_document_generator(os.getenv("GOOGLE_API_KEY"), os.getenv("GCP_PROJECT_ID"))
         generated_images = {}
-        
-        # print(f"Generating images for {len(state['image_requirements'])} requirements...")
-        
-        # # Generate images for each requirement
-        # max_images = 3
-        # for i, req in enumerate(state["image_requirements"]):
-        #     print(f"Generating image for: {req['section']}")
-        #     if i >= max_images:
-        #         break
-        #     image_path = generator.generate_image(req["prompt"], req["section"])
-        #     if image_path:
-        #         # section_key = req["section"].replace(' ', '_').lower()
-        #         section_key = normalize_section_key(req["section"])
-        #         generated_images[section_key] = image_path
-        #         print(f"Generated image: {image_path}")
-        #     else:
-        #         print(f"Failed to generate image for: {req['section']}")
-        
-        # state["generated_images"] = generated_images
-        # print(generated_images)
-        
+
+        if state.get("generate_visuals") and state.get("include_images", True):
+            if not state.get("image_requirements"):
+                state = extract_visual_requirements(state)
+            requirements = state.get("image_requirements") or []
+            print(f"Generating images for {len(requirements)} requirements...")
+
+            # Every requirement is generated, in parallel under the shared Imagen quota
+            generated_images, image_errors = generate_images(generator, requirements, style=state.get("image_style"))
+            if image_errors:
+                state["visual_generation_errors"] = (state.get("visual_generation_errors") or []) + image_errors
+            state["generated_images"] = generated_images
+
         # Create visual document
-        # if generated_images:
         doc_path = generator.create_visual_document(
             state["lesson_plan"], 
             generated_images
@@ -202,4 +193,4 @@ def generate_visual_content(state: AgentState) -> AgentState:
         state["visual_generation_errors"] = [f"Error generating visuals: {str(e)}"]
         print(f"Error in generate_visual_content: {str(e)}")
     
-    return state
\ No newline at end of file
+    return state
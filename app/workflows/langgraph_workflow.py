@@ -1,26 +1,31 @@
 # app/workflows/langgraph_workflow.py
-from langgraph.graph import StateGraph, END
-from app.services.lesson_generator import (
-    determine_class_type,
-    generate_single_grade_lesson, 
-    generate_multigrade_lesson,
-    should_use_multigrade,
-    AgentState
-)
-from app.services.visual_workflow_nodes import (
-    generate_resources,
-    generate_visual_content
-)
+from app.services.clients import get_or_create
 
 def create_workflow():
+    # langgraph and the node modules are imported here, with the graph, so
+    # that importing the routes doesn't pay for them before the first request
+    from langgraph.graph import StateGraph, END
+    from app.services.lesson_generator import (
+        determine_class_type,
+        generate_single_grade_lesson, 
+        generate_multigrade_lesson,
+        should_use_multigrade,
+        AgentState
+    )
+    from app.services.metrics import timed_node
+    from app.services.visual_workflow_nodes import (
+        generate_resources,
+        generate_visual_content
+    )
+
     graph = StateGraph(AgentState)
     
-    # Existing nodes
-    graph.add_node("classifier", determine_class_type)
-    graph.add_node("single_professor", generate_single_grade_lesson)
-    graph.add_node("multigrade_professor", generate_multigrade_lesson)
-    graph.add_node("generate_visuals", generate_visual_content)
-    graph.add_node("generate_resources", generate_resources)
+    # Existing nodes, each timed into the node latency histogram
+    graph.add_node("classifier", timed_node("classifier", determine_class_type))
+    graph.add_node("single_professor", timed_node("single_professor", generate_single_grade_lesson))
+    graph.add_node("multigrade_professor", timed_node("multigrade_professor", generate_multigrade_lesson))
+    graph.add_node("generate_visuals", timed_node("generate_visuals", generate_visual_content))
+    graph.add_node("generate_resources", timed_node("generate_resources", generate_resources))
     
     # Set entry point
     graph.set_entry_point("classifier")
@@ -42,4 +47,6 @@ def create_workflow():
     
     return graph.compile()
 
-workflow = create_workflow()
\ No newline at end of file
+def get_workflow():
+    """The compiled lesson graph, built on first use and shared by all requests"""
+    return get_or_create("lesson_workflow", create_workflow)
@@ -0,0 +1,73 @@
+"""Measure cold start: a fresh interpreter importing the app and serving its first request.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start --runs 5
+
+Each run is a new Python process, as on a Cloud Functions cold start. It times
+`from app import create_app`, `create_app()` and the first GET /api/health
+through the Flask test client, then prints the median of each along with the
+app's own startup report from the last run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/api/health')
+served = time.perf_counter()
+try:
+    from app.services.startup_timing import startup_timer
+    startup = startup_timer.get_report()
+except ImportError:  # trees from before the startup report
+    startup = None
+print("RESULT " + json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first_request": served - created,
+    "total": served - started,
+    "status": response.status_code,
+    "startup": startup,
+}))
+"""
+
+
+def run_once(env, cwd) -> dict:
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=cwd,
+                            capture_output=True, text=True, check=True).stdout
+    line = next(line for line in output.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tree", default=".", help="checkout to measure, e.g. a git worktree of an older commit")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    results = [run_once(env, args.tree) for _ in range(args.runs)]
+
+    for stage in ("import", "create_app", "first_request", "total"):
+        samples = [result[stage] for result in results]
+        print(f"{stage:<14} median {statistics.median(samples):7.3f} s  best {min(samples):7.3f} s")
+
+    startup = results[-1]["startup"] or {}
+    print("\nstartup report of the last run:")
+    for phase in startup.get("phases", []):
+        print(f"  {phase['kind']:<6} {phase['name']:<40} {phase['seconds']:8.3f}")
+    print(f"  first request served {startup.get('first_request_seconds')} s after app import began")
+
+
+if __name__ == "__main__":
+    main()
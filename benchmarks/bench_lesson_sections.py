@@ -0,0 +1,97 @@
+"""Benchmark the lesson-plan section tokenizer on long, multi-week plans.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_lesson_sections --weeks 12 --repeat 20
+
+Compares tokenize_lesson_plan with the line-by-line dict parser it replaced
+and reports how many sections the old parser lost to repeated headings.
+"""
+import argparse
+import os
+import statistics
+import time
+
+# Importing app.services loads the Flask app package, which builds Gemini clients
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.services.lesson_sections import tokenize_lesson_plan  # noqa: E402
+
+PHASES = ["**Hook Activity**", "Objective:", "Instruction", "Practice"]
+BODY_LINES = [
+    "Show a picture of a village market with fruit stalls. Ask students to name the fruits.",
+    "Students work in pairs and count the mangoes shown on the chart.",
+    "Display flashcards with numbers 1 to 20 and read them aloud together.",
+    "शिक्षक बच्चों को चित्र दिखाकर प्रश्न पूछेंगे।",
+    "विद्यार्थी आपल्या वहीत उत्तरे लिहितील.",
+    "",
+]
+
+
+def build_plan(weeks: int, days: int = 5, lines_per_phase: int = 15) -> str:
+    lines = ["Lesson plan for a multigrade classroom.", ""]
+    for week in range(1, weeks + 1):
+        lines.append(f"## Week {week}")
+        for day in range(1, days + 1):
+            lines.append(f"### Day {day}")
+            for phase in PHASES:
+                lines.append(phase)
+                lines.extend(BODY_LINES[i % len(BODY_LINES)] for i in range(lines_per_phase))
+    return "\n".join(lines)
+
+
+def legacy_parse(lesson_plan: str) -> dict:
+    """The per-line parser previously in VisualDocumentGenerator._parse_lesson_sections"""
+    sections = {}
+    current_section = "Overview"
+    current_content = []
+    for line in lesson_plan.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if (line.startswith('**') and line.endswith('**') or
+                line.startswith('#') or
+                line.endswith(':') or
+                any(keyword in line.lower() for keyword in ['hook', 'objective', 'instruction', 'practice'])):
+            if current_content:
+                sections[current_section] = '\n'.join(current_content)
+            current_section = line.strip('*#:').strip()
+            current_content = []
+        else:
+            current_content.append(line)
+    if current_content:
+        sections[current_section] = '\n'.join(current_content)
+    return sections
+
+
+def time_ms(func, arg, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(arg)
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    plan = build_plan(args.weeks)
+    print(f"Plan: {args.weeks} weeks, {plan.count(chr(10)) + 1} lines, {len(plan):,} chars")
+
+    legacy, legacy_median, legacy_best = time_ms(legacy_parse, plan, args.repeat)
+    sections, median, best = time_ms(tokenize_lesson_plan, plan, args.repeat)
+    # Bodies are sliced lazily; include that cost for a like-for-like comparison
+    _, body_median, _ = time_ms(lambda p: [s.body for s in tokenize_lesson_plan(p)], plan, args.repeat)
+
+    print(f"legacy parser : median {legacy_median:8.2f} ms  best {legacy_best:8.2f} ms  sections kept {len(legacy)}")
+    print(f"tokenizer     : median {median:8.2f} ms  best {best:8.2f} ms  sections kept {len(sections)}")
+    print(f"tokenizer+body: median {body_median:8.2f} ms")
+    print(f"unique keys   : {len({s.key for s in sections}) == len(sections)}")
+
+
+if __name__ == "__main__":
+    main()
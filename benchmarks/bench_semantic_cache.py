@@ -0,0 +1,94 @@
+"""Check which reworded lesson requests the semantic cache treats as the same chapter, then time lookups.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_semantic_cache --entries 2000 --repeat 200
+
+Each sample pair stores one topic and looks up the other, and the script
+reports the outcome against the expected one. Pairs that differ only by a
+number ("table of 9" and "table of 2") must be misses. The script exits
+with status 1 if any pair comes out wrong. It then fills a cache with
+synthetic topics and times find_similar.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from app.services.lesson_cache import LessonCache
+
+# (stored subject, stored topic, requested subject, requested topic, expected hit)
+PAIRS = [
+    ("maths", "addition grade 2", "Mathematics", "Addition for Std 2", True),
+    ("Maths", "Addition of 2-digit numbers", "maths", "two digit number addition", False),
+    ("Maths", "Multiplication table of 9", "Maths", "Multiplication table of 2", False),
+    ("Maths", "Numbers up to 100", "Maths", "Numbers up to 1000", False),
+    ("Maths", "Addition of 2 digit numbers", "Maths", "Addition of 3 digit numbers", False),
+    ("Maths", "table of 09", "Maths", "Table of 9", True),
+    ("EVS", "Living and non-living things", "Environmental Studies", "living and nonliving thing", True),
+    ("EVS", "Living things", "EVS", "Non-living things", False),
+    ("English", "Nouns", "English", "Pronouns", False),
+    ("Science", "The water cycle", "Science", "Water pollution", False),
+    ("Maths", "Addition", "Maths", "Addition with carry", False),
+]
+BASE_PARAMS = {"grades": "2", "medium": "English", "special_needs": "", "message": ""}
+RESULT = {"lesson_plan": "stored plan"}
+# Synthetic topics carry no numbers, so they all share one partition
+WORDS = ["fruit", "river", "market", "festival", "animal", "village", "weather", "garden", "train", "family",
+         "forest", "school", "money", "shape", "clock", "seed", "bird", "water", "sound", "colour"]
+
+
+def synthetic_topic(i: int) -> str:
+    return f"{WORDS[i % len(WORDS)]} and {WORDS[i // len(WORDS) % len(WORDS)]} {WORDS[i // 400 % len(WORDS)]} stories"
+
+
+def check_pairs(cache_dir: str) -> int:
+    failures = 0
+    for i, (stored_subject, stored_topic, subject, topic, expected) in enumerate(PAIRS):
+        cache = LessonCache(os.path.join(cache_dir, f"pair{i}.sqlite3"), ttl_seconds=3600, max_entries=10,
+                            semantic_threshold=0.85)
+        if cache.semantic_index is None:
+            print("numpy is not installed; the semantic cache is off")
+            return 1
+        cache.put("lesson", {**BASE_PARAMS, "subject": stored_subject, "topic": stored_topic}, RESULT)
+        found = cache.find_similar("lesson", {**BASE_PARAMS, "subject": subject, "topic": topic})
+        hit = found is not None
+        similarity = f"{found[1]['similarity']:.2f}" if hit else "  - "
+        status = "ok  " if hit == expected else "FAIL"
+        failures += hit != expected
+        print(f"  {status} {'hit ' if hit else 'miss'} {similarity}  {stored_topic!r} -> {topic!r}")
+    return failures
+
+
+def time_lookups(cache_dir: str, entries: int, repeat: int):
+    cache = LessonCache(os.path.join(cache_dir, "timing.sqlite3"), ttl_seconds=3600, max_entries=entries + 1,
+                        semantic_threshold=0.85)
+    for i in range(entries):
+        cache.put("lesson", {**BASE_PARAMS, "subject": "Maths", "topic": synthetic_topic(i)}, RESULT)
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        cache.find_similar("lesson", {**BASE_PARAMS, "subject": "Mathematics", "topic": synthetic_topic(i * 7) + " for class 2"})
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"find_similar over {entries} entries: median {statistics.median(samples):.3f} ms  best {min(samples):.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="sahayak-semantic-") as cache_dir:
+        print("sample pairs (threshold 0.85):")
+        failures = check_pairs(cache_dir)
+        time_lookups(cache_dir, args.entries, args.repeat)
+    if failures:
+        print(f"{failures} pair(s) matched differently than expected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
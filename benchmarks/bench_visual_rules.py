@@ -0,0 +1,144 @@
+"""Microbenchmark rule-based visual requirement extraction on large Hindi and Marathi plans.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_visual_rules --weeks 8 --repeat 20
+
+Times find_visual_cues (one combined scan) against the six separate
+re.findall calls it replaced, then the whole of _extract_by_rules including
+section lookup and prompt building. First it checks that _remove_duplicates
+merges sample rewordings and keeps different pictures apart, in English and
+Devanagari, and exits with status 1 if any pair comes out wrong.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+# Importing app.services loads the Flask app package, which builds Gemini clients
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.services.lesson_sections import LessonOutline  # noqa: E402
+from app.services.visual_document_generator import (  # noqa: E402
+    ImageRequirement, VisualDocumentGenerator, find_visual_cues
+)
+
+PLAN_LINES = {
+    "hindi": [
+        "**शुरुआत (Hook Activity)**",
+        "Show a picture of a village fair with a giant wheel and sweet shops. Ask students what they see.",
+        "शिक्षक बच्चों से मेले के बारे में बात करेंगे और उनके अनुभव पूछेंगे। बच्चे अपने शब्दों में बताएँगे",
+        "Display चित्र कार्ड जिन पर फल और सब्ज़ियाँ बनी हों।",
+        "कक्षा 3 के विद्यार्थी जोड़ी में काम करेंगे (e.g., आम, केला, अमरूद) और गिनती लिखेंगे",
+        "अभ्यास: बच्चे अपनी कॉपी में पाँच वाक्य लिखेंगे और एक-दूसरे को पढ़कर सुनाएँगे",
+    ],
+    "marathi": [
+        "**सुरुवात (Hook Activity)**",
+        "Use flashcards with pictures of farm animals to start the lesson. Show each card slowly.",
+        "शिक्षक विद्यार्थ्यांना शेतातील प्राण्यांविषयी प्रश्न विचारतील आणि त्यांची उत्तरे फळ्यावर लिहितील",
+        "picture story with a farmer and his bullocks ploughing the field. Ask what happens next.",
+        "विद्यार्थी गटात बसून चित्र काढतील आणि रंग भरतील",
+        "सराव: प्रत्येक विद्यार्थी आपल्या वहीत तीन वाक्ये लिहील",
+    ],
+}
+
+# (first description, second description, expected to share one image)
+DEDUP_PAIRS = [
+    ("children counting mangoes in a basket", "kids counting mangoes in the basket", True),
+    ("a farmer ploughing a field with bullocks", "a market stall selling vegetables", False),
+    ("पेड़ पर बैठी चिड़िया", "पेड़ पर बैठी चिड़िया का चित्र", True),
+    # Differ only in vowel signs; splitting on \w would drop them and make these identical
+    ("पानी का नल", "पानी की नाली", False),
+    ("मेले में झूला", "मेला में झोला", False),
+]
+
+LEGACY_PATTERNS = [
+    (r"Show a picture of (.+?)(?:\.|Ask|Show)", "Hook Activity"),
+    (r"picture story with (.+?)(?:\.|Ask)", "Picture Story"),
+    (r"Display (.+?)(?:\.|\")", "Display Material"),
+    (r"\(e\.g\.,\s*(.+?)\)", "Example Visual"),
+    (r"[Uu]se (.+?pictures?.+?)(?:\.|Use|Show)", "Activity Material"),
+    (r"flashcards with (.+?)(?:\.|Play)", "Flashcard Material"),
+]
+
+
+def build_plan(language: str, weeks: int, days: int = 5, repeats_per_day: int = 8) -> str:
+    lines = []
+    for week in range(1, weeks + 1):
+        lines.append(f"## Week {week}")
+        for day in range(1, days + 1):
+            lines.append(f"### Day {day}")
+            for _ in range(repeats_per_day):
+                lines.extend(PLAN_LINES[language])
+    return "\n".join(lines)
+
+
+def legacy_extract(lesson_plan: str) -> list:
+    """Matching step of the previous _extract_by_rules"""
+    found = []
+    for pattern, section_type in LEGACY_PATTERNS:
+        for i, match in enumerate(re.findall(pattern, lesson_plan, re.IGNORECASE | re.DOTALL)):
+            if len(match.strip()) > 5:
+                found.append((f"{section_type} {i+1}", match.strip()))
+    return found
+
+
+def check_dedup(generator: VisualDocumentGenerator) -> int:
+    failures = 0
+    for first, second, expected in DEDUP_PAIRS:
+        requirements = [
+            ImageRequirement(section="Activity 1", description=first, prompt=first),
+            ImageRequirement(section="Activity 2", description=second, prompt=second),
+        ]
+        merged = len(generator._remove_duplicates(requirements)) == 1
+        status = "ok  " if merged == expected else "FAIL"
+        failures += merged != expected
+        print(f"  {status} {'merged' if merged else 'kept  '}  {first!r} / {second!r}")
+    return failures
+
+
+def time_ms(func, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # The extractor needs no clients; skip __init__ so no Vertex AI setup happens
+    generator = VisualDocumentGenerator.__new__(VisualDocumentGenerator)
+
+    print("near-duplicate descriptions:")
+    failures = check_dedup(generator)
+
+    for language in PLAN_LINES:
+        plan = build_plan(language, args.weeks)
+        outline = LessonOutline(plan)
+        print(f"{language}: {plan.count(chr(10)) + 1} lines, {len(plan):,} chars")
+
+        legacy, legacy_median, legacy_best = time_ms(lambda: legacy_extract(plan), args.repeat)
+        cues, median, best = time_ms(lambda: find_visual_cues(plan), args.repeat)
+        _, full_median, full_best = time_ms(lambda: generator._extract_by_rules(plan, outline), args.repeat)
+        print(f"  six findall calls  : median {legacy_median:7.2f} ms  best {legacy_best:7.2f} ms  "
+              f"matches {len(legacy)}  longest {max((len(d) for _, d in legacy), default=0):,} chars")
+        print(f"  combined scan      : median {median:7.2f} ms  best {best:7.2f} ms  "
+              f"matches {len(cues)}  longest {max((len(d) for _, d, _ in cues), default=0):,} chars")
+        print(f"  _extract_by_rules  : median {full_median:7.2f} ms  best {full_best:7.2f} ms")
+
+    if failures:
+        print(f"{failures} description pair(s) deduplicated differently than expected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
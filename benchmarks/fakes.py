@@ -0,0 +1,189 @@
+"""Deterministic offline stand-ins for Gemini, Imagen and Cloud Storage.
+
+Each fake sleeps for a configurable latency and returns payloads shaped like
+the real service's, so the app's parsing, caching and document code runs as in
+production while no network calls are made.
+"""
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+LESSON_SECTION = """## Day {day}
+**Hook Activity**
+Show a picture of {scene}. Ask students what they notice.
+Objective:
+Students will describe {topic} in their own words.
+Practice
+Use flashcards with pictures of everyday objects. Students work in pairs and take turns.
+"""
+SCENES = ["a village market with fruit stalls", "a kite festival", "a school garden", "a river with boats", "a farm at sunrise"]
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    parts = []
+    for message in messages:
+        content = message.content
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "\n".join(parts)
+
+
+def _lesson_plan(seed: int, target_chars: int) -> str:
+    sections = []
+    day = 1
+    while sum(len(s) for s in sections) < target_chars:
+        sections.append(LESSON_SECTION.format(day=day, scene=SCENES[(seed + day) % len(SCENES)], topic="the lesson topic"))
+        day += 1
+    return "\n".join(sections)
+
+
+class FakeGeminiChatModel(BaseChatModel):
+    """Chat model answering each of the app's prompt shapes with a canned, well-formed reply"""
+
+    model_name: str = "fake-gemini"
+    latency_seconds: float = 0.5
+    response_chars: int = 4000
+    stream_chunk_chars: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def _respond(self, prompt: str) -> str:
+        seed = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+        if "resource_list" in prompt:
+            plan = _lesson_plan(seed, self.response_chars)
+            resources = [
+                {"unique_id": f"res_{seed % 1000}_{i}", "name": f"Resource {i}", "type": "image",
+                 "description": f"illustration of {SCENES[(seed + i) % len(SCENES)]}"}
+                for i in range(3)
+            ]
+            return "```json\n" + json.dumps({"resource_list": resources, "lesson_plan": plan}) + "\n```"
+        if "Return ONLY a JSON array" in prompt:
+            if "answer strings" in prompt:
+                return json.dumps(["पेड़ पर", "गाना गाती थी", "मेहनत करना"], ensure_ascii=False)
+            return json.dumps([{"section": "Practice", "description": "children sorting picture cards"}])
+        if "comma-separated list" in prompt:
+            return "जल, घर, फल, नल, बस"
+        if "Object:" in prompt and "Sound:" in prompt:
+            return "\n".join(f"Object: {word}, Sound: {word[0]}" for word in ["आम", "बकरी", "कमल", "घर"])
+        if "Example: Problem:" in prompt:
+            return "\n".join(f"Problem: {10 + i} + {20 + i}, Answer: {30 + 2 * i}" for i in range(3))
+        if "Problem:" in prompt:
+            return "\n\n".join(f"Problem: राम के पास {i} आम हैं और उसे 2 और मिले। कुल कितने?\nAnswer: {i + 2}" for i in range(1, 4))
+        if "Story:" in prompt and "Questions:" in prompt:
+            return ("Story:\nएक छोटी चिड़िया पेड़ पर रहती थी। वह रोज़ गाना गाती थी।\n"
+                    "Questions:\nचिड़िया कहाँ रहती थी?\nवह क्या करती थी?")
+        return _lesson_plan(seed, self.response_chars)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        prompt = _prompt_text(messages)
+        text = self._respond(prompt)
+        message = AIMessage(content=text, usage_metadata=_usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt = _prompt_text(messages)
+        text = self._respond(prompt)
+        chunks = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+        # Spread the latency over the chunks, with a longer wait before the first token
+        time.sleep(self.latency_seconds / 2)
+        per_chunk = (self.latency_seconds / 2) / len(chunks)
+        for index, chunk in enumerate(chunks):
+            time.sleep(per_chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk)
+            # Gemini reports usage once, with the last chunk
+            usage = _usage(prompt, text) if index == len(chunks) - 1 else None
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk, usage_metadata=usage))
+
+
+def _usage(prompt: str, text: str) -> dict:
+    """Token counts in the shape Gemini returns them, at about 4 characters per token"""
+    input_tokens, output_tokens = len(prompt) // 4 + 1, len(text) // 4 + 1
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+
+def _png(seed: int, side: int) -> bytes:
+    """A valid RGB PNG of noise (so it doesn't compress away) derived from seed"""
+    rng = random.Random(seed)
+    raw = b''.join(b'\x00' + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', side, side, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b'')
+
+
+class FakePredictionClient:
+    """Stands in for aiplatform's PredictionServiceClient on the Imagen endpoint"""
+
+    def __init__(self, latency_seconds: float = 2.0, image_bytes: int = 200_000):
+        self.latency_seconds = latency_seconds
+        self.side = max(8, int((image_bytes / 3) ** 0.5))
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def predict(self, endpoint: str, instances: List[Dict], parameters: Dict, timeout: Optional[float] = None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_seconds if timeout is None else min(self.latency_seconds, timeout))
+        seed = int(hashlib.sha256(instances[0]["prompt"].encode('utf-8')).hexdigest()[:8], 16)
+        image = base64.b64encode(_png(seed, self.side)).decode('ascii')
+        return SimpleNamespace(predictions=[{"bytesBase64Encoded": image, "mimeType": "image/png"}])
+
+
+class _FakeBlob:
+    def __init__(self, bucket: "_FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+
+    def exists(self) -> bool:
+        time.sleep(self.bucket.client.latency_seconds / 4)
+        return self.name in self.bucket.objects
+
+    def upload_from_string(self, data: bytes, content_type: str = None):
+        time.sleep(self.bucket.client.latency_seconds)
+        self.bucket.objects[self.name] = len(data)
+
+
+class _FakeBucket:
+    def __init__(self, client: "FakeStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.objects: Dict[str, int] = {}
+
+    def blob(self, name: str) -> _FakeBlob:
+        return _FakeBlob(self, name)
+
+
+class FakeStorageClient:
+    """In-memory Cloud Storage client; objects only record their size"""
+
+    def __init__(self, latency_seconds: float = 0.2):
+        self.latency_seconds = latency_seconds
+        self._buckets: Dict[str, _FakeBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> _FakeBucket:
+        with self._lock:
+            return self._buckets.setdefault(name, _FakeBucket(self, name))
@@ -0,0 +1,190 @@
+"""Offline load test of the lesson, visual lesson and std 1-2 assessment endpoints.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --concurrency 8 --requests 40
+    python -m benchmarks.load_test --endpoints lesson --llm-latency 0.2 --cache
+
+The app is built with create_app() and served on a local threaded WSGI server.
+Gemini, Imagen and Cloud Storage are replaced by the deterministic stand-ins in
+benchmarks/fakes.py, preloaded into the shared client registry, so the run needs no credentials or network and its numbers
+move only when the app's own overhead does. For each endpoint it reports
+throughput, p50/p95/p99 latency and error count, then the peak RSS of the
+process (server and client threads share it).
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ID = "load-test-project"
+LOCATION = "us-central1"
+
+ENDPOINTS = {
+    "lesson": ("/api/generate-lesson", lambda i: {
+        "subject": "Mathematics", "grades": "3", "topic": f"Fractions {i}", "medium": "Hindi",
+    }),
+    "visual": ("/api/generate-visual-lesson", lambda i: {
+        "subject": "Science", "grades": "4", "topic": f"Water cycle {i}", "medium": "Marathi",
+        "image_style": "cartoon",
+    }),
+    "assessment": ("/api/assessment/questionnaire/std1-2", lambda i: {
+        "language": "Hindi", "student_name": f"Student {i}", "class_section": "A",
+    }),
+}
+
+
+def configure_environment(args):
+    """Must run before anything under app/ is imported: modules read settings at import time"""
+    scratch = tempfile.mkdtemp(prefix="sahayak-load-")
+    os.environ.setdefault("GOOGLE_API_KEY", "load-test")
+    os.environ["GCP_PROJECT_ID"] = PROJECT_ID
+    os.environ["LESSON_CACHE_ENABLED"] = "True" if args.cache else "False"
+    os.environ["LESSON_CACHE_PATH"] = os.path.join(scratch, "lesson-cache.sqlite3")
+    os.environ["IMAGE_CACHE_DIR"] = os.path.join(scratch, "images")
+    os.environ["ARTIFACT_DIR"] = os.path.join(scratch, "artifacts")
+    os.environ["MEDIA_STORAGE_BACKEND"] = "gcs"
+    os.environ.setdefault("IMAGEN_REQUESTS_PER_MINUTE", "100000")
+    os.environ.setdefault("IMAGEN_BURST", "1000")
+    # Quotas out of the way; the adaptive concurrency limit still applies
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "100000")
+    os.environ.setdefault("LLM_BURST", "1000")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000")
+    return scratch
+
+
+def install_fakes(args):
+    """Preload the shared client registry so the app picks the fakes up on first use"""
+    from benchmarks.fakes import FakeGeminiChatModel, FakePredictionClient, FakeStorageClient
+    from app.services import clients
+    from app.services.limited_chat_model import rate_limited
+    from app.services.metrics import llm_metrics_handler
+
+    def chat(model_name):
+        # Wrapped like the real models, so the shared limiter is part of what's measured
+        fake = FakeGeminiChatModel(model_name=model_name, latency_seconds=args.llm_latency,
+                                   response_chars=args.response_chars)
+        return rate_limited(model_name, fake, callbacks=[llm_metrics_handler])
+
+    storage = FakeStorageClient(latency_seconds=args.upload_latency)
+    clients.get_or_create(("prediction_client", LOCATION),
+                          lambda: FakePredictionClient(args.image_latency, args.image_bytes))
+    clients.get_or_create(("storage_client", PROJECT_ID), lambda: storage)
+    clients.get_or_create(("vertex_ai_init", PROJECT_ID, LOCATION), lambda: True)
+    for model in ("gemini-1.5-pro", "gemini-1.5-flash"):
+        clients.get_or_create(("gemini_chat", model, os.getenv("GOOGLE_API_KEY")), lambda: chat(model))
+
+
+def start_server():
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    # One access log line per request would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def post(url: str, payload: dict, timeout: float):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.loads(response.read())
+            ok = response.status == 200 and body.get("success", True) is not False
+    except (urllib.error.URLError, OSError, ValueError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def percentile(samples, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return float("nan")
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def run_endpoint(base_url: str, name: str, args):
+    path, make_payload = ENDPOINTS[name]
+    # Distinct payloads defeat the lesson cache; --repeat-payloads measures the hit path
+    payloads = [make_payload(0 if args.repeat_payloads else i) for i in range(args.requests)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda payload: post(base_url + path, payload, args.timeout), payloads))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "endpoint": path,
+        "requests": len(results),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=["lesson", "visual", "assessment"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--response-chars", type=int, default=4000, help="size of fake lesson plan replies")
+    parser.add_argument("--image-latency", type=float, default=2.0, help="seconds per fake Imagen call")
+    parser.add_argument("--image-bytes", type=int, default=200_000, help="approximate raw size of fake images")
+    parser.add_argument("--upload-latency", type=float, default=0.2, help="seconds per fake GCS upload")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--cache", action="store_true", help="leave the lesson result cache enabled")
+    parser.add_argument("--repeat-payloads", action="store_true", help="send the same body every time")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    install_fakes(args)
+    server, base_url = start_server()
+
+    try:
+        results = [run_endpoint(base_url, name, args) for name in args.endpoints]
+    finally:
+        server.shutdown()
+
+    rss = peak_rss_mb()
+    if args.json:
+        print(json.dumps({"results": results, "peak_rss_mb": rss}, indent=2))
+        return
+
+    print(f"\nconcurrency {args.concurrency}, {args.requests} requests per endpoint, "
+          f"LLM {args.llm_latency}s, Imagen {args.image_latency}s, cache {'on' if args.cache else 'off'}")
+    print(f"{'endpoint':<40} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>6}")
+    for result in results:
+        print(f"{result['endpoint']:<40} {result['throughput']:7.2f} {result['p50']:7.2f} "
+              f"{result['p95']:7.2f} {result['p99']:7.2f} {result['errors']:6d}")
+    print(f"peak RSS {rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()